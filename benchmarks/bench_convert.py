@@ -0,0 +1,82 @@
+"""
+convert.py のストリーミング変換ベンチマーク。
+
+    $ python3 benchmarks/bench_convert.py --rows 1000000
+
+合成した JSON 配列（または NDJSON）を一時ファイルへ書き出し、
+CSV への変換時間と最大 RSS を計測する。
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts"))
+from convert import convert  # noqa: E402
+
+
+def write_input(path: str, rows: int, ndjson: bool, seed: int = 0) -> None:
+    """get_activity.py と同じスキーマの合成データをストリームで書き出す"""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        if not ndjson:
+            f.write("[\n")
+        for i in range(rows):
+            record = {
+                "id": 10_000_000_000 + i,
+                "name": "夕方のランニング",
+                "distance": round(rng.uniform(1000, 30000), 1),
+                "moving_time": rng.randint(600, 20000),
+                "elapsed_time": rng.randint(600, 26000),
+                "total_elevation_gain": round(rng.uniform(0, 1500), 1),
+                "type": rng.choice(["Run", "Ride", "Walk"]),
+                "start_date": "2025-09-29T15:30:41Z",
+                "start_date_local": "2025-09-30T00:30:41Z",
+                "timezone": "(GMT+09:00) Asia/Tokyo",
+                "utc_offset": 32400.0,
+                "average_speed": 2.5,
+                "max_speed": 6.0,
+                "average_cadence": None if rng.random() < 0.2 else 80.0,
+                "average_temp": None,
+                "average_heartrate": None if rng.random() < 0.2 else 150.0,
+                "max_heartrate": None if rng.random() < 0.2 else 180.0,
+            }
+            if ndjson:
+                f.write(json.dumps(record) + "\n")
+            else:
+                f.write(("," if i else "") + json.dumps(record, indent=4) + "\n")
+        if not ndjson:
+            f.write("]\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="convert.py のベンチマーク")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--ndjson", action="store_true", help="NDJSON 形式で入力を生成する")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        src = os.path.join(tmp, "activities.json")
+        dst = os.path.join(tmp, "activities.csv")
+        write_input(src, args.rows, args.ndjson)
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        start = time.perf_counter()
+        with open(src, "r", encoding="utf-8") as f:
+            result = convert(f, dst)
+        elapsed = time.perf_counter() - start
+
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"input : {os.path.getsize(src) / 1e6:.1f} MB ({'ndjson' if args.ndjson else 'json array'})")
+        print(f"rows  : {result['rows']}")
+        print(f"time  : {elapsed:.2f} s ({result['rows'] / elapsed:,.0f} rows/s)")
+        # ru_maxrss は Linux では KB 単位
+        print(f"maxrss: {rss_after / 1024:.1f} MB (before convert: {rss_before / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
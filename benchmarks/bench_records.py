@@ -0,0 +1,93 @@
+"""
+取り込み経路のレコード表現のメモリと変換時間の比較。
+
+    $ python3 benchmarks/bench_records.py --rows 100000
+
+API の JSON（NDJSON の1行ずつ）から次の3通りで保持し、tracemalloc で測った保持量と
+ストア型の DataFrame / Arrow への変換時間を出す。
+- dict: get_activity.to_activity_info の 17 キーの dict のリスト（従来）
+- Activity: slots 付き dataclass のリスト
+- ActivityBatch: 列ごとの numpy 配列（struct of arrays）
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, List, Tuple
+
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(ROOT, "scripts"))
+sys.path.append(os.path.join(ROOT, "src"))
+from get_activity import to_activity_info  # noqa: E402
+from models.records import Activity, ActivityBatch  # noqa: E402
+from models.store import ACTIVITY_COLUMNS, normalize_types, to_records  # noqa: E402
+from synthetic import generate_activities  # noqa: E402
+
+
+def api_lines(rows: int, seed: int = 0) -> List[str]:
+    """API と同じ形（ISO 8601 文字列・欠損は null）の NDJSON 行"""
+    return [json.dumps(r, ensure_ascii=False) for r in to_records(generate_activities(rows, seed=seed))]
+
+
+def retained(build: Callable[[], Any]) -> Tuple[Any, float]:
+    """build() の戻り値が保持しているメモリ（MB）。途中の一時オブジェクトは含まない"""
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    value = build()
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return value, (after - before) / 1e6
+
+
+def timed(fn: Callable[[], Any], repeat: int = 3) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="レコード表現のメモリ・変換時間の比較")
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    lines = api_lines(args.rows)
+    per = 100_000 / args.rows
+
+    dicts, dict_mb = retained(lambda: [to_activity_info(json.loads(line)) for line in lines])
+    activities, activity_mb = retained(lambda: [Activity.from_api(json.loads(line)) for line in lines])
+
+    def build_batch() -> ActivityBatch:
+        # ページ（200 件）ごとに列へ変換してつなぐ（sync_full と同じ）
+        pages = range(0, len(lines), 200)
+        return ActivityBatch.concat([ActivityBatch.from_api([json.loads(line) for line in lines[i:i + 200]]) for i in pages])
+
+    batch, batch_mb = retained(build_batch)
+
+    print(f"rows: {args.rows:,}")
+    print(f"{'representation':<16}{'MB / 100k':>12}{'vs dict':>10}")
+    for name, mb in (("dict", dict_mb), ("Activity", activity_mb), ("ActivityBatch", batch_mb)):
+        print(f"{name:<16}{mb * per:>12.1f}{mb / dict_mb:>10.2f}")
+
+    print(f"\n{'to store DataFrame':<36}{'seconds':>10}")
+    cases = {
+        "dict -> normalize_types(DataFrame)": lambda: normalize_types(pd.DataFrame(dicts, columns=ACTIVITY_COLUMNS)),
+        "Activity -> ActivityBatch -> pandas": lambda: ActivityBatch.from_activities(activities).to_pandas(),
+        "ActivityBatch.to_pandas": batch.to_pandas,
+        "ActivityBatch.to_arrow": batch.to_arrow,
+    }
+    for name, fn in cases.items():
+        print(f"{name:<36}{timed(fn):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
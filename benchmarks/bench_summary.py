@@ -0,0 +1,63 @@
+"""
+prepare_summary_source のベンチマーク（1パス集計と旧実装の比較）。
+
+    $ python3 benchmarks/bench_summary.py --rows 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from models.activities import prepare_summary_source  # noqa: E402
+from synthetic import generate_activities  # noqa: E402
+
+
+def legacy_prepare_summary_source(df: pd.DataFrame) -> pd.DataFrame:
+    """旧実装（3つのフィルタ済みコピー + 全体の isocalendar）"""
+    now = pd.Timestamp.now(tz="Asia/Tokyo")
+    this_month = df[df["start_date_local"].dt.month == now.month]
+    this_week = df[df["start_date_local"].dt.isocalendar().week == now.isocalendar().week]
+    latest_30 = df.sort_values("start_date_local", ascending=False).head(30)
+    for d in (df, this_month, this_week, latest_30):
+        d["distance_km"] = d["distance"] / 1000.0
+    return pd.DataFrame({
+        "総走行距離 (km)": [latest_30["distance_km"].sum(), this_month["distance_km"].sum(), this_week["distance_km"].sum()],
+        "総獲得標高 (m)": [
+            latest_30["total_elevation_gain"].sum(),
+            this_month["total_elevation_gain"].sum(),
+            this_week["total_elevation_gain"].sum(),
+        ],
+    })
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="prepare_summary_source のベンチマーク")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df = generate_activities(args.rows)
+    # 旧実装は引数の df に列を書き込むので別のコピーを渡す
+    legacy_df = df.copy()
+
+    new = best_of(lambda: prepare_summary_source(df), args.repeat)
+    old = best_of(lambda: legacy_prepare_summary_source(legacy_df), args.repeat)
+    print(f"rows   : {args.rows:,}")
+    print(f"legacy : {old * 1000:.1f} ms")
+    print(f"vector : {new * 1000:.1f} ms  ({old / new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
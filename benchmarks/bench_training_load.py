@@ -0,0 +1,46 @@
+"""
+トレーニング負荷の更新のベンチマーク（全履歴の再計算と、保存した状態からの差分更新の比較）。
+
+差分更新は履歴の長さに依らず一定時間になることを、1年〜N年の履歴で確かめる。
+
+    $ python3 benchmarks/bench_training_load.py --years 10
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from models.training_load import apply_activities, empty_state, training_load  # noqa: E402
+from synthetic import generate_activities  # noqa: E402
+
+
+def best_of(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="トレーニング負荷の更新のベンチマーク")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'years':>5} {'rows':>8} {'full (ms)':>10} {'append 1 (us)':>14}")
+    for years in sorted({1, max(args.years // 2, 1), args.years}):
+        # 合成データは1日あたり約1件なので件数で期間を決め、最新の1件を「新しい活動」とする
+        df = generate_activities(years * 365, days=years * 365).iloc[::-1]
+        history, new = df.iloc[:-1], df.iloc[-1:]
+        state = apply_activities(empty_state(), history)
+
+        full = best_of(lambda: training_load(df), max(args.repeat // 4, 1))
+        step = best_of(lambda: apply_activities(state, new), args.repeat)
+        print(f"{years:>5} {len(df):>8,} {full * 1000:>10.1f} {step * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
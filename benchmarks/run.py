@@ -0,0 +1,189 @@
+"""
+ベンチマークスイート。
+
+合成履歴（synthetic.py）を件数ごとに作り、モデル層の関数とダッシュボードのデータ経路
+（src/snapshot.py の build_snapshot ＝ app.py の main と同じ呼び出し）を計測する。
+各関数の最短時間と、tracemalloc で測ったピークメモリを JSON に保存する。
+
+    $ python3 benchmarks/run.py --sizes 1k,100k,1M
+    $ python3 benchmarks/run.py --sizes 1k,100k --compare benchmarks/results/20250930-120000.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(os.path.join(ROOT, "src"))
+from config import LATEST_N  # noqa: E402
+from models.activities import (  # noqa: E402
+    chart_source_from_store, latest_n, load_activities, load_latest_n, prepare_chart_source,
+    prepare_summary_source, summary_from_store, top3_by, top_k_by, top_k_from_store,
+)
+from models.aggregate import aggregate_periods  # noqa: E402
+from models.rollup import build_rollups, write_rollups  # noqa: E402
+from models.store import count_rows, load_page, write_store  # noqa: E402
+from models.training_load import training_load  # noqa: E402
+from snapshot import build_snapshot  # noqa: E402
+from synthetic import SIZES, generate_activities  # noqa: E402
+
+BACKEND_EXT = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow", "db": ".db"}
+TOP_COLUMNS = ["distance", "total_elevation_gain", "max_heartrate"]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def measure(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """repeat 回の最短時間（秒）と、別の1回で測った Python 側のピーク確保量（MB）"""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(times), "peak_mb": peak / 1e6}
+
+
+def model_cases(df: pd.DataFrame) -> Dict[str, Callable[[], Any]]:
+    """メモリ上の DataFrame に対する関数"""
+    latest = latest_n(df)
+    return {
+        "latest_n": lambda: latest_n(df),
+        "top3_by": lambda: top3_by(df, "distance"),
+        "top_k_by(3 cols)": lambda: top_k_by(df, TOP_COLUMNS, 3),
+        "prepare_chart_source(latest)": lambda: prepare_chart_source(latest),
+        "prepare_chart_source(all)": lambda: prepare_chart_source(df),
+        "prepare_summary_source": lambda: prepare_summary_source(df),
+        "aggregate_periods": lambda: aggregate_periods(df),
+        "build_rollups": lambda: build_rollups(df),
+        "training_load": lambda: training_load(df),
+    }
+
+
+def store_cases(uri: str, rows: int) -> Dict[str, Callable[[], Any]]:
+    """ストアから読む関数と、ダッシュボードのデータ経路全体"""
+    return {
+        "load_activities": lambda: load_activities(uri),
+        "load_latest_n": lambda: load_latest_n(LATEST_N, uri),
+        "top_k_from_store": lambda: top_k_from_store(TOP_COLUMNS, 3, LATEST_N, uri),
+        "summary_from_store": lambda: summary_from_store(LATEST_N, uri),
+        "chart_source_from_store(all)": lambda: chart_source_from_store(uri=uri),
+        "load_page(middle)": lambda: load_page(rows // 2, LATEST_N, uri),
+        "count_rows": lambda: count_rows(uri),
+        "main data path": lambda: build_snapshot(uri),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    except OSError:
+        return None
+    return out.stdout.strip() or None
+
+
+def run(sizes: List[str], backends: List[str], repeat: int, seed: int) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = []
+
+    def record(size: str, rows: int, backend: str, name: str, m: Dict[str, float]) -> None:
+        results.append({"size": size, "rows": rows, "backend": backend, "name": name, **m})
+        print(f"{size:>5} {backend:>8} {name:<30} {m['seconds'] * 1000:>10.1f} ms {m['peak_mb']:>9.1f} MB", flush=True)
+
+    for size in sizes:
+        rows = SIZES[size]
+        start = time.perf_counter()
+        df = generate_activities(rows, seed=seed)
+        print(f"{size}: generated {rows:,} rows in {time.perf_counter() - start:.1f} s", file=sys.stderr)
+        for name, fn in model_cases(df).items():
+            record(size, rows, "memory", name, measure(fn, repeat))
+
+        for backend in backends:
+            with tempfile.TemporaryDirectory() as tmp:
+                uri = os.path.join(tmp, "activities" + BACKEND_EXT[backend])
+                # 書き込みは1回だけ計測する（ストアとロールアップを同期後と同じ状態にする）
+                record(size, rows, backend, "write_store", measure(lambda df=df, uri=uri: write_store(df, uri), 1))
+                write_rollups(build_rollups(df), uri)
+                for name, fn in store_cases(uri, rows).items():
+                    record(size, rows, backend, name, measure(fn, repeat))
+        del df
+        gc.collect()
+
+    return {
+        "meta": {
+            "timestamp": pd.Timestamp.now(tz="UTC").isoformat(),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "repeat": repeat,
+            "seed": seed,
+            # ru_maxrss は Linux では KB 単位
+            "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """同じ (件数, バックエンド, 関数) の時間とメモリを前回の結果と比べる"""
+    key = ("size", "backend", "name")
+    base = {tuple(r[k] for k in key): r for r in baseline["results"]}
+    print(f"\nbaseline: {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')})")
+    for r in current["results"]:
+        b = base.get(tuple(r[k] for k in key))
+        if b is None or not b["seconds"]:
+            continue
+        ratio = r["seconds"] / b["seconds"]
+        flag = "  <- slower" if ratio > 1.2 else ""
+        print(
+            f"{r['size']:>5} {r['backend']:>8} {r['name']:<30} "
+            f"time x{ratio:5.2f}  peak {b['peak_mb']:8.1f} -> {r['peak_mb']:8.1f} MB{flag}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="モデル層とダッシュボードのデータ経路のベンチマーク")
+    parser.add_argument("--sizes", default="1k,100k,1M", help=f"計測する件数（{','.join(SIZES)} から選ぶ）")
+    parser.add_argument("--backends", default="parquet,arrow", help=f"ストアのバックエンド（{','.join(BACKEND_EXT)}）")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="結果の JSON（既定は benchmarks/results/<日時>.json）")
+    parser.add_argument("--compare", help="比較する前回の結果 JSON")
+    args = parser.parse_args()
+
+    sizes = [s for s in args.sizes.split(",") if s]
+    backends = [b for b in args.backends.split(",") if b]
+    unknown = [s for s in sizes if s not in SIZES] + [b for b in backends if b not in BACKEND_EXT]
+    if unknown:
+        parser.error(f"未知の指定です: {', '.join(unknown)}")
+
+    result = run(sizes, backends, args.repeat, args.seed)
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"結果を '{output}' に保存しました。", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(result, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+ベンチマーク用の合成アクティビティ履歴（get_activity.py の fetch_activities と同じスキーマ）。
+
+乱数シードを固定しているので、同じ引数なら毎回同じデータになる。
+ケイデンス・心拍・気温の欠損率と、複数のタイムゾーン（夏時間のある地域を含む）を実データに寄せている。
+"""
+import os
+import sys
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from models.store import ACTIVITY_COLUMNS, normalize_types  # noqa: E402
+
+# ベンチマークで使う件数
+SIZES = {"1k": 1_000, "100k": 100_000, "1M": 1_000_000, "10M": 10_000_000}
+
+# (Strava の timezone 表記, 標準時の UTC オフセット秒, 夏時間があるか, 割合)
+TIMEZONES = [
+    ("(GMT+09:00) Asia/Tokyo", 32400, False, 0.70),
+    ("(GMT-08:00) America/Los_Angeles", -28800, True, 0.10),
+    ("(GMT+00:00) Europe/London", 0, True, 0.10),
+    ("(GMT+10:00) Australia/Sydney", 36000, True, 0.05),
+    ("(GMT+05:30) Asia/Kolkata", 19800, False, 0.05),
+]
+
+# 欠損率（センサーを付けていない・屋内など）
+NAN_RATES = {"average_cadence": 0.2, "average_temp": 0.5, "average_heartrate": 0.15, "max_heartrate": 0.15}
+
+# 履歴の長さの上限（これを超える件数は1日に複数件として詰める）
+MAX_SPAN_DAYS = 30 * 365
+
+
+def _dst(local: pd.DatetimeIndex, southern: np.ndarray) -> np.ndarray:
+    # 夏時間はおおまかに北半球 4-10 月、南半球 10-3 月とする
+    month = local.month.to_numpy()
+    north = (month >= 4) & (month <= 10)
+    south = (month >= 10) | (month <= 3)
+    return np.where(southern, south, north)
+
+
+def generate_activities(
+    n: int, seed: int = 0, end: str = "2025-09-30", days: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    n 件の履歴を end から days 日（既定は n 日、最大 MAX_SPAN_DAYS 日）遡って生成し、新しい順で返す。
+    start_date_local は現地時刻を UTC として持ち、start_date は utc_offset を引いた本当の UTC。
+    """
+    rng = np.random.default_rng(seed)
+    span = days if days is not None else min(max(n, 1), MAX_SPAN_DAYS)
+    offsets = np.sort(rng.integers(0, span * 86400, size=n))
+    local = pd.Timestamp(end, tz="UTC") - pd.to_timedelta(offsets, unit="s")
+
+    tz_index = rng.choice(len(TIMEZONES), size=n, p=[tz[3] for tz in TIMEZONES])
+    names = np.array([tz[0] for tz in TIMEZONES], dtype=object)
+    base_offset = np.array([tz[1] for tz in TIMEZONES], dtype=np.float64)
+    has_dst = np.array([tz[2] for tz in TIMEZONES])
+    southern = np.array(["Australia" in tz[0] for tz in TIMEZONES])
+    dst = has_dst[tz_index] & _dst(local, southern[tz_index])
+    utc_offset = base_offset[tz_index] + np.where(dst, 3600.0, 0.0)
+
+    moving = rng.integers(600, 20000, size=n)
+    distance = np.round(moving * rng.uniform(1.5, 4.0, size=n), 1)
+
+    def with_nan(col: str, values: np.ndarray) -> np.ndarray:
+        return np.where(rng.random(n) < NAN_RATES[col], np.nan, values)
+
+    df = pd.DataFrame({
+        "id": 10_000_000_000 + np.arange(n)[::-1],
+        "name": rng.choice(["夜のランニング", "夕方のランニング", "朝のトレイルランニング", "Afternoon Run"], size=n),
+        "distance": distance,
+        "moving_time": moving,
+        "elapsed_time": moving + rng.integers(0, 3000, size=n),
+        "total_elevation_gain": np.round(rng.gamma(2.0, 60.0, size=n), 1),
+        "type": rng.choice(["Run", "Ride", "Walk", "Hike"], size=n, p=[0.7, 0.15, 0.1, 0.05]),
+        "start_date": local - pd.to_timedelta(utc_offset, unit="s"),
+        "start_date_local": local,
+        "timezone": names[tz_index],
+        "utc_offset": utc_offset,
+        "average_speed": np.round(distance / moving, 3),
+        "max_speed": np.round(distance / moving * rng.uniform(1.2, 3.0, size=n), 1),
+        "average_cadence": with_nan("average_cadence", np.round(rng.normal(80, 5, n), 1)),
+        "average_temp": with_nan("average_temp", rng.integers(0, 35, n).astype(np.float64)),
+        "average_heartrate": with_nan("average_heartrate", np.round(rng.normal(145, 12, n), 1)),
+        "max_heartrate": with_nan("max_heartrate", np.round(rng.normal(180, 10, n))),
+    })
+    return normalize_types(df[ACTIVITY_COLUMNS])
@@ -1,593 +1,97 @@
+import argparse
 import json
-import csv
 import os
+import re
+import sys
+from collections import Counter
+from typing import Any, Dict, IO, Iterator
 
-# JSONデータ（例として変数に直接代入）
-data = [
-    {
-        "id": 15977030560,
-        "name": "\u591c\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 5354.0,
-        "moving_time": 2705,
-        "elapsed_time": 2773,
-        "total_elevation_gain": 17.0,
-        "type": "Run",
-        "start_date": "2025-09-29T15:30:41Z",
-        "start_date_local": "2025-09-30T00:30:41Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 1.979,
-        "max_speed": 5.8,
-        "average_cadence": 72.8,
-        "average_temp": 24,
-        "average_heartrate": 133.2,
-        "max_heartrate": 201.0
-    },
-    {
-        "id": 15960258117,
-        "name": "Afternoon Trail Run",
-        "distance": 26934.7,
-        "moving_time": 11557,
-        "elapsed_time": 19264,
-        "total_elevation_gain": 1168.6,
-        "type": "Run",
-        "start_date": "2025-09-28T01:17:29Z",
-        "start_date_local": "2025-09-28T10:17:29Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 2.331,
-        "max_speed": 9.8,
-        "average_cadence": None,
-        "average_temp": None,
-        "average_heartrate": None,
-        "max_heartrate": None
-    },
-    {
-        "id": 15961207928,
-        "name": "\u671d\u306e\u30c8\u30ec\u30a4\u30eb\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 22685.0,
-        "moving_time": 15274,
-        "elapsed_time": 23883,
-        "total_elevation_gain": 1391.0,
-        "type": "Run",
-        "start_date": "2025-09-28T00:52:31Z",
-        "start_date_local": "2025-09-28T09:52:31Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 1.485,
-        "max_speed": 4.8,
-        "average_cadence": 60.3,
-        "average_temp": 24,
-        "average_heartrate": 116.4,
-        "max_heartrate": 171.0
-    },
-    {
-        "id": 15954228672,
-        "name": "\u671d\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 9871.0,
-        "moving_time": 7153,
-        "elapsed_time": 7154,
-        "total_elevation_gain": 2.0,
-        "type": "Run",
-        "start_date": "2025-09-27T00:51:07Z",
-        "start_date_local": "2025-09-27T09:51:07Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 1.38,
-        "max_speed": 4.8,
-        "average_cadence": 73.2,
-        "average_temp": 28,
-        "average_heartrate": 142.9,
-        "max_heartrate": 203.0
-    },
-    {
-        "id": 15932839425,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 12778.0,
-        "moving_time": 6277,
-        "elapsed_time": 6592,
-        "total_elevation_gain": 35.0,
-        "type": "Run",
-        "start_date": "2025-09-25T10:43:49Z",
-        "start_date_local": "2025-09-25T19:43:49Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 2.036,
-        "max_speed": 9.07,
-        "average_cadence": 79.8,
-        "average_temp": 24,
-        "average_heartrate": 154.1,
-        "max_heartrate": 198.0
-    },
-    {
-        "id": 15920210463,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 6473.0,
-        "moving_time": 5537,
-        "elapsed_time": 5539,
-        "total_elevation_gain": 41.0,
-        "type": "Run",
-        "start_date": "2025-09-24T10:19:53Z",
-        "start_date_local": "2025-09-24T19:19:53Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 1.169,
-        "max_speed": 11.2,
-        "average_cadence": 79.0,
-        "average_temp": 23,
-        "average_heartrate": 149.3,
-        "max_heartrate": 190.0
-    },
-    {
-        "id": 15905031618,
-        "name": "\u671d\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 25088.0,
-        "moving_time": 9731,
-        "elapsed_time": 9732,
-        "total_elevation_gain": 135.0,
-        "type": "Run",
-        "start_date": "2025-09-22T23:38:23Z",
-        "start_date_local": "2025-09-23T08:38:23Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 2.578,
-        "max_speed": 7.0,
-        "average_cadence": 82.8,
-        "average_temp": 24,
-        "average_heartrate": 165.1,
-        "max_heartrate": 210.0
-    },
-    {
-        "id": 15905028510,
-        "name": "\u671d\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 1833.0,
-        "moving_time": 835,
-        "elapsed_time": 837,
-        "total_elevation_gain": 7.0,
-        "type": "Run",
-        "start_date": "2025-09-22T23:21:39Z",
-        "start_date_local": "2025-09-23T08:21:39Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 2.195,
-        "max_speed": 5.0,
-        "average_cadence": 77.2,
-        "average_temp": 24,
-        "average_heartrate": 144.9,
-        "max_heartrate": 184.0
-    },
-    {
-        "id": 15883891014,
-        "name": "\u671d\u306e\u30c8\u30ec\u30a4\u30eb\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 28815.0,
-        "moving_time": 26417,
-        "elapsed_time": 26419,
-        "total_elevation_gain": 1416.0,
-        "type": "Run",
-        "start_date": "2025-09-21T00:08:29Z",
-        "start_date_local": "2025-09-21T09:08:29Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 1.091,
-        "max_speed": 6.8,
-        "average_cadence": 66.2,
-        "average_temp": 25,
-        "average_heartrate": 124.4,
-        "max_heartrate": 182.0
-    },
-    {
-        "id": 15876841169,
-        "name": "\u591c\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 4916.0,
-        "moving_time": 1553,
-        "elapsed_time": 1965,
-        "total_elevation_gain": 22.0,
-        "type": "Run",
-        "start_date": "2025-09-20T13:40:57Z",
-        "start_date_local": "2025-09-20T22:40:57Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 3.165,
-        "max_speed": 6.0,
-        "average_cadence": 82.5,
-        "average_temp": 26,
-        "average_heartrate": 151.8,
-        "max_heartrate": 197.0
-    },
-    {
-        "id": 15854954140,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 15024.0,
-        "moving_time": 6206,
-        "elapsed_time": 6207,
-        "total_elevation_gain": 78.0,
-        "type": "Run",
-        "start_date": "2025-09-18T10:36:59Z",
-        "start_date_local": "2025-09-18T19:36:59Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 2.421,
-        "max_speed": 10.6,
-        "average_cadence": 79.7,
-        "average_temp": 24,
-        "average_heartrate": 145.1,
-        "max_heartrate": 199.0
-    },
-    {
-        "id": 15840977274,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 5088.0,
-        "moving_time": 2244,
-        "elapsed_time": 2352,
-        "total_elevation_gain": 30.0,
-        "type": "Run",
-        "start_date": "2025-09-17T10:22:35Z",
-        "start_date_local": "2025-09-17T19:22:35Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 2.267,
-        "max_speed": 5.0,
-        "average_cadence": 78.7,
-        "average_temp": 27,
-        "average_heartrate": 152.2,
-        "max_heartrate": 185.0
-    },
-    {
-        "id": 15830132180,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 5147.0,
-        "moving_time": 2657,
-        "elapsed_time": 3437,
-        "total_elevation_gain": 298.0,
-        "type": "Run",
-        "start_date": "2025-09-16T11:32:54Z",
-        "start_date_local": "2025-09-16T20:32:54Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 1.937,
-        "max_speed": 5.8,
-        "average_cadence": 77.5,
-        "average_temp": 28,
-        "average_heartrate": 154.7,
-        "max_heartrate": 193.0
-    },
-    {
-        "id": 15806158149,
-        "name": "\u671d\u306e\u30c8\u30ec\u30a4\u30eb\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 19604.0,
-        "moving_time": 12915,
-        "elapsed_time": 23271,
-        "total_elevation_gain": 1012.0,
-        "type": "Run",
-        "start_date": "2025-09-14T00:37:48Z",
-        "start_date_local": "2025-09-14T09:37:48Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 1.518,
-        "max_speed": 4.2,
-        "average_cadence": 61.7,
-        "average_temp": 27,
-        "average_heartrate": 120.0,
-        "max_heartrate": 179.0
-    },
-    {
-        "id": 15794480896,
-        "name": "\u5348\u5f8c\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 3249.0,
-        "moving_time": 2096,
-        "elapsed_time": 3640,
-        "total_elevation_gain": 33.0,
-        "type": "Run",
-        "start_date": "2025-09-13T07:53:20Z",
-        "start_date_local": "2025-09-13T16:53:20Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 1.55,
-        "max_speed": 8.0,
-        "average_cadence": 76.1,
-        "average_temp": 26,
-        "average_heartrate": 132.1,
-        "max_heartrate": 179.0
-    },
-    {
-        "id": 15785913108,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 20046.0,
-        "moving_time": 6571,
-        "elapsed_time": 6572,
-        "total_elevation_gain": 93.0,
-        "type": "Run",
-        "start_date": "2025-09-12T11:15:15Z",
-        "start_date_local": "2025-09-12T20:15:15Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 3.051,
-        "max_speed": 8.0,
-        "average_cadence": 84.5,
-        "average_temp": 25,
-        "average_heartrate": 167.4,
-        "max_heartrate": 210.0
-    },
-    {
-        "id": 15762597507,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 7454.0,
-        "moving_time": 3587,
-        "elapsed_time": 3589,
-        "total_elevation_gain": 12.0,
-        "type": "Run",
-        "start_date": "2025-09-10T10:22:02Z",
-        "start_date_local": "2025-09-10T19:22:02Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 2.078,
-        "max_speed": 7.4,
-        "average_cadence": 78.7,
-        "average_temp": 27,
-        "average_heartrate": 148.5,
-        "max_heartrate": 197.0
-    },
-    {
-        "id": 15761870685,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 0.0,
-        "moving_time": 5,
-        "elapsed_time": 5,
-        "total_elevation_gain": 0,
-        "type": "Run",
-        "start_date": "2025-09-10T10:17:00Z",
-        "start_date_local": "2025-09-10T19:17:00Z",
-        "timezone": "(GMT+09:00) Asia/Chita",
-        "utc_offset": 32400.0,
-        "average_speed": 0.0,
-        "max_speed": 0.0,
-        "average_cadence": None,
-        "average_temp": 0,
-        "average_heartrate": None,
-        "max_heartrate": None
-    },
-    {
-        "id": 15750711561,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 3341.0,
-        "moving_time": 2135,
-        "elapsed_time": 2136,
-        "total_elevation_gain": 141.0,
-        "type": "Run",
-        "start_date": "2025-09-09T11:10:16Z",
-        "start_date_local": "2025-09-09T20:10:16Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 1.565,
-        "max_speed": 9.4,
-        "average_cadence": 72.9,
-        "average_temp": 29,
-        "average_heartrate": 141.7,
-        "max_heartrate": 179.0
-    },
-    {
-        "id": 15741592415,
-        "name": "\u591c\u306e\u30c8\u30ec\u30a4\u30eb\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 5242.0,
-        "moving_time": 1733,
-        "elapsed_time": 1733,
-        "total_elevation_gain": 11.0,
-        "type": "Run",
-        "start_date": "2025-09-08T14:28:31Z",
-        "start_date_local": "2025-09-08T23:28:31Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 3.025,
-        "max_speed": 5.6,
-        "average_cadence": 83.0,
-        "average_temp": 28,
-        "average_heartrate": 162.7,
-        "max_heartrate": 198.0
-    },
-    {
-        "id": 15712590743,
-        "name": "\u671d\u306e\u30c8\u30ec\u30a4\u30eb\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 19339.0,
-        "moving_time": 19903,
-        "elapsed_time": 19907,
-        "total_elevation_gain": 1066.0,
-        "type": "Run",
-        "start_date": "2025-09-06T00:50:25Z",
-        "start_date_local": "2025-09-06T09:50:25Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 0.972,
-        "max_speed": 4.8,
-        "average_cadence": 65.4,
-        "average_temp": 27,
-        "average_heartrate": 130.9,
-        "max_heartrate": 185.0
-    },
-    {
-        "id": 15710507757,
-        "name": "\u671d\u306e\u30c8\u30ec\u30a4\u30eb\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 0.0,
-        "moving_time": 11,
-        "elapsed_time": 13,
-        "total_elevation_gain": 0,
-        "type": "Run",
-        "start_date": "2025-09-05T23:07:30Z",
-        "start_date_local": "2025-09-06T08:07:30Z",
-        "timezone": "(GMT+09:00) Asia/Chita",
-        "utc_offset": 32400.0,
-        "average_speed": 0.0,
-        "max_speed": 0.0,
-        "average_cadence": None,
-        "average_temp": 27,
-        "average_heartrate": 75.5,
-        "max_heartrate": 77.0
-    },
-    {
-        "id": 15694004113,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 7616.0,
-        "moving_time": 3834,
-        "elapsed_time": 3835,
-        "total_elevation_gain": 14.0,
-        "type": "Run",
-        "start_date": "2025-09-04T10:52:46Z",
-        "start_date_local": "2025-09-04T19:52:46Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 1.986,
-        "max_speed": 6.4,
-        "average_cadence": 78.0,
-        "average_temp": 28,
-        "average_heartrate": 144.6,
-        "max_heartrate": 169.0
-    },
-    {
-        "id": 15693998762,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 1936.0,
-        "moving_time": 886,
-        "elapsed_time": 886,
-        "total_elevation_gain": 0.0,
-        "type": "Run",
-        "start_date": "2025-09-04T10:37:44Z",
-        "start_date_local": "2025-09-04T19:37:44Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 2.185,
-        "max_speed": 4.6,
-        "average_cadence": 78.2,
-        "average_temp": 29,
-        "average_heartrate": 137.4,
-        "max_heartrate": 166.0
-    },
-    {
-        "id": 15670013751,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 4414.0,
-        "moving_time": 2914,
-        "elapsed_time": 2916,
-        "total_elevation_gain": 258.0,
-        "type": "Run",
-        "start_date": "2025-09-02T10:30:40Z",
-        "start_date_local": "2025-09-02T19:30:40Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 1.515,
-        "max_speed": 5.4,
-        "average_cadence": 78.0,
-        "average_temp": 30,
-        "average_heartrate": 148.3,
-        "max_heartrate": 190.0
-    },
-    {
-        "id": 15658889827,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 3854.0,
-        "moving_time": 2525,
-        "elapsed_time": 2526,
-        "total_elevation_gain": 29.0,
-        "type": "Run",
-        "start_date": "2025-09-01T11:39:56Z",
-        "start_date_local": "2025-09-01T20:39:56Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 1.526,
-        "max_speed": 5.0,
-        "average_cadence": 81.2,
-        "average_temp": 28,
-        "average_heartrate": 135.4,
-        "max_heartrate": 173.0
-    },
-    {
-        "id": 15650263426,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 15139.0,
-        "moving_time": 5315,
-        "elapsed_time": 5316,
-        "total_elevation_gain": 69.0,
-        "type": "Run",
-        "start_date": "2025-08-31T09:10:06Z",
-        "start_date_local": "2025-08-31T18:10:06Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 2.848,
-        "max_speed": 5.6,
-        "average_cadence": 85.9,
-        "average_temp": 30,
-        "average_heartrate": 164.3,
-        "max_heartrate": 190.0
-    },
-    {
-        "id": 15636233597,
-        "name": "\u671d\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 18326.0,
-        "moving_time": 11196,
-        "elapsed_time": 11197,
-        "total_elevation_gain": 63.0,
-        "type": "Run",
-        "start_date": "2025-08-29T23:18:09Z",
-        "start_date_local": "2025-08-30T08:18:09Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 1.637,
-        "max_speed": 5.8,
-        "average_cadence": 81.1,
-        "average_temp": 31,
-        "average_heartrate": 142.8,
-        "max_heartrate": 182.0
-    },
-    {
-        "id": 15636229745,
-        "name": "\u3086\u308b\u3075\u308fto\u829d",
-        "distance": 14005.0,
-        "moving_time": 8727,
-        "elapsed_time": 8729,
-        "total_elevation_gain": 19.0,
-        "type": "Run",
-        "start_date": "2025-08-28T10:40:40Z",
-        "start_date_local": "2025-08-28T19:40:40Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 1.605,
-        "max_speed": 8.0,
-        "average_cadence": 81.8,
-        "average_temp": 27,
-        "average_heartrate": 139.7,
-        "max_heartrate": 185.0
-    },
-    {
-        "id": 15603238745,
-        "name": "\u5915\u65b9\u306e\u30e9\u30f3\u30cb\u30f3\u30b0",
-        "distance": 8631.0,
-        "moving_time": 3310,
-        "elapsed_time": 3598,
-        "total_elevation_gain": 45.0,
-        "type": "Run",
-        "start_date": "2025-08-27T10:12:59Z",
-        "start_date_local": "2025-08-27T19:12:59Z",
-        "timezone": "(GMT+09:00) Asia/Tokyo",
-        "utc_offset": 32400.0,
-        "average_speed": 2.608,
-        "max_speed": 6.2,
-        "average_cadence": 82.8,
-        "average_temp": 28,
-        "average_heartrate": 159.5,
-        "max_heartrate": 198.0
-    }
-]
+# src/ 配下のモデル層（ストア定義）を利用する
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from config import DATA_STORE_URI  # noqa: E402
+from models.ingest import BATCH_SIZE, dedupe_batches, to_batches, validate_records, write_batches  # noqa: E402
+from models.store import sync_state_path, write_sync_state  # noqa: E402
 
-# 出力するCSVファイル名
-csv_filename = "tmp_csv/activities.csv"
+CHUNK_SIZE = 1 << 16  # 入力を読むブロックサイズ（文字数）
 
-os.makedirs(os.path.dirname(csv_filename), exist_ok=True)
+# レコード間の区切り（空白・配列のカンマ）
+_SEPARATOR = re.compile(r"[\s,]*")
 
-# CSVに書き出す
-with open(csv_filename, mode='w', newline='', encoding='utf-8') as f:
-    # ヘッダーを自動で取得
-    fieldnames = data[0].keys()
-    writer = csv.DictWriter(f, fieldnames=fieldnames)
-    
-    writer.writeheader()
-    writer.writerows(data)
 
-print(f"CSVファイル '{csv_filename}' を作成しました。")
+def iter_json_records(f: IO[str], chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    JSON 配列（get_activity.py の出力）または NDJSON を1レコードずつ読み出す。
+    ファイル全体を読み込まず、ブロック単位でデコードするのでメモリは一定。
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    started = False
+    while True:
+        pos = _SEPARATOR.match(buf, pos).end()
+        if not started and pos < len(buf):
+            # 先頭の '[' があれば配列形式、なければ NDJSON として扱う
+            if buf[pos] == "[":
+                pos += 1
+            started = True
+            continue
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        if pos < len(buf):
+            try:
+                record, pos = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield record
+                continue
+        if eof:
+            return
+        # 未処理の残りに次のブロックを継ぎ足す
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buf = buf[pos:] + chunk
+        pos = 0
+
+
+def convert(src: IO[str], uri: str = DATA_STORE_URI, batch_size: int = BATCH_SIZE) -> Dict[str, Any]:
+    """
+    JSON ストリームを検証・重複除去してストアへバッチ単位で書き出す（models/ingest.py のパイプライン）。
+    戻り値は書き込み件数・最新アクティビティ（ハイウォーターマーク）・捨てた件数。
+    """
+    rejected: Counter = Counter()
+    batches = to_batches(validate_records(iter_json_records(src), rejected), batch_size)
+    result = write_batches(dedupe_batches(batches, duplicates=rejected), uri)
+    return {**result, "rejected": dict(rejected)}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="get_activity.py の JSON 出力をストアへ変換する")
+    parser.add_argument("input", nargs="?", default="-", help="入力 JSON / NDJSON ファイル（省略時は標準入力）")
+    parser.add_argument("-o", "--output", default=DATA_STORE_URI, help="出力先ストアの URI（.csv / .parquet / .arrow / .db・.sqlite。DATA_STORE_URI と同じ形式）")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="まとめて書き出す行数")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """エントリーポイント"""
+    args = parse_args()
+    if args.input == "-":
+        result = convert(sys.stdin, args.output, args.batch_size)
+    else:
+        with open(args.input, "r", encoding="utf-8") as f:
+            result = convert(f, args.output, args.batch_size)
+
+    # 変換したデータを起点に --incremental 同期を続けられるようにする
+    if result["newest"]:
+        write_sync_state(result["newest"], sync_state_path(args.output))
+
+    print(f"ストア '{args.output}' を作成しました。（{result['rows']} 件）", file=sys.stderr)
+    if result["rejected"]:
+        print("除外:", result["rejected"], file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
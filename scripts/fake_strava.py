@@ -0,0 +1,200 @@
+"""
+オフライン確認用の Strava API スタブサーバ。
+
+data/fixtures/ に記録したレスポンスを返し、本物と同じ X-RateLimit-* ヘッダを付ける。
+上限を小さくしたり、一定割合で 429 / 503 を返したりして再試行・レート制御を確認できる。
+
+    $ python3 scripts/fake_strava.py --port 8080 --limit 20,100 --fail-rate 0.1
+    $ STRAVA_API_BASE=http://localhost:8080/api/v3 python3 scripts/get_activity.py --incremental
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "fixtures")
+
+
+def load_fixture(name: str) -> Any:
+    with open(os.path.join(FIXTURE_DIR, name), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class FakeStrava:
+    """レスポンスの中身と使用量カウンタ（15分枠・日次）を持つ"""
+
+    def __init__(self, limits=(200, 2000), fail_rate: float = 0.0, seed: int = 0):
+        self.activities: List[Dict[str, Any]] = load_fixture("activities.json")
+        self.athlete: Dict[str, Any] = load_fixture("athlete.json")
+        self.limits = limits
+        self.fail_rate = fail_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.usage = [0, 0]
+        self.window = int(time.time() // 900)
+        self.requests = 0
+
+    def count(self) -> bool:
+        """使用量を1増やし、上限内なら True"""
+        with self.lock:
+            window = int(time.time() // 900)
+            if window != self.window:
+                self.window, self.usage[0] = window, 0
+            self.requests += 1
+            self.usage[0] += 1
+            self.usage[1] += 1
+            return self.usage[0] <= self.limits[0] and self.usage[1] <= self.limits[1]
+
+    def headers(self) -> Dict[str, str]:
+        return {
+            "X-RateLimit-Limit": f"{self.limits[0]},{self.limits[1]}",
+            "X-RateLimit-Usage": f"{self.usage[0]},{self.usage[1]}",
+        }
+
+    def list_activities(self, query: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", ["30"])[0])
+        items = self.activities
+        if "after" in query:
+            after = int(query["after"][0])
+            # after 指定時は本物と同じく古い順で返す
+            items = [a for a in items if datetime.fromisoformat(a["start_date"]).timestamp() > after]
+            items = sorted(items, key=lambda a: a["start_date"])
+        return items[(page - 1) * per_page: page * per_page]
+
+
+def synthetic_streams(activity: Dict[str, Any]) -> Dict[str, Any]:
+    """アクティビティの距離・時間・心拍から1秒ごとのストリームを決定的に作る"""
+    rng = random.Random(activity["id"])
+    n = int(activity.get("elapsed_time") or activity.get("moving_time") or 0)
+    speed = (activity.get("distance") or 0) / max(n, 1)
+    hr = activity.get("average_heartrate")
+    time_s, distance, altitude, heartrate, cadence, latlng = [], [], [], [], [], []
+    d, alt, lat, lng = 0.0, 50.0, 35.68, 139.76
+    for t in range(n):
+        v = max(speed * rng.uniform(0.7, 1.3), 0.0)
+        d += v
+        alt += rng.uniform(-0.5, 0.5)
+        lat += v * 1e-5
+        time_s.append(t)
+        distance.append(round(d, 1))
+        altitude.append(round(alt, 1))
+        heartrate.append(int(hr + rng.uniform(-15, 15)) if hr else None)
+        cadence.append(int(80 + rng.uniform(-5, 5)))
+        latlng.append([round(lat, 6), round(lng, 6)])
+
+    def stream(data: List[Any]) -> Dict[str, Any]:
+        return {"data": data, "series_type": "time", "original_size": n, "resolution": "high"}
+
+    streams = {
+        "time": stream(time_s),
+        "distance": stream(distance),
+        "altitude": stream(altitude),
+        "cadence": stream(cadence),
+        "latlng": stream(latlng),
+    }
+    if hr:
+        streams["heartrate"] = stream(heartrate)
+    return streams
+
+
+def make_handler(state: FakeStrava):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body: Any) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in state.headers().items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _guard(self) -> bool:
+            if not state.count():
+                self._send(429, {"message": "Rate Limit Exceeded"})
+                return False
+            if state.rng.random() < state.fail_rate:
+                self._send(state.rng.choice([429, 503]), {"message": "injected failure"})
+                return False
+            return True
+
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            if not self._guard():
+                return
+            if url.path.endswith("/athlete"):
+                self._send(200, state.athlete)
+            elif url.path.endswith("/athlete/activities"):
+                self._send(200, state.list_activities(parse_qs(url.query)))
+            elif url.path.endswith("/streams"):
+                activity_id = int(url.path.rstrip("/").split("/")[-2])
+                activity = next((a for a in state.activities if a["id"] == activity_id), None)
+                if activity is None:
+                    self._send(404, {"message": "Record Not Found"})
+                else:
+                    self._send(200, synthetic_streams(activity))
+            else:
+                self._send(404, {"message": "Record Not Found"})
+
+        def do_POST(self) -> None:
+            url = urlparse(self.path)
+            length = int(self.headers.get("Content-Length") or 0)
+            form = parse_qs(self.rfile.read(length).decode("utf-8"))
+            if not self._guard():
+                return
+            if url.path.endswith("/oauth/token"):
+                token = {
+                    "token_type": "Bearer",
+                    "access_token": "fake-access-token",
+                    "refresh_token": "fake-refresh-token",
+                    "expires_at": int(time.time()) + 6 * 3600,
+                    "expires_in": 6 * 3600,
+                }
+                # 本物と同じく、認可コードの交換時だけアスリート情報を付ける
+                if form.get("grant_type") == ["authorization_code"]:
+                    token["athlete"] = state.athlete
+                self._send(200, token)
+            else:
+                self._send(404, {"message": "Record Not Found"})
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def serve(port: int = 8080, limits=(200, 2000), fail_rate: float = 0.0) -> ThreadingHTTPServer:
+    """サーバを起動して返す（バックグラウンドスレッドで動く）"""
+    state = FakeStrava(limits, fail_rate)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(state))
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Strava API のスタブサーバ")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--limit", default="200,2000", help="15分枠,日次の上限")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="429/503 を返す割合")
+    args = parser.parse_args()
+
+    limits = tuple(int(v) for v in args.limit.split(","))
+    server = serve(args.port, limits, args.fail_rate)
+    print(f"Fake Strava API: http://127.0.0.1:{args.port}/api/v3")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,103 +1,220 @@
 import os
+import sys
 import json
-import requests
-from typing import Dict, Any, List
-from stravalib import Client
-
-
-def load_tokens(json_path: str) -> Dict[str, Any]:
-    """strava_tokens.json からトークン情報を読み込む"""
-    with open(json_path, "r") as f:
-        return json.load(f)
+import argparse
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Dict, Any, Iterable, Iterator, List, Optional
+from strava_http import default_client
+from token_manager import token_manager
+
+# src/ 配下のモデル層（ストア）を利用する
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from config import DATA_STORE_URI  # noqa: E402
+from models.store import (  # noqa: E402
+    read_store, merge_activities, load_sync_state, save_sync_state, after_epoch, write_sync_state, sync_state_path
+)
+from models.ingest import BATCH_SIZE, dedupe_batches, validate_records, write_batches  # noqa: E402
+from models.records import ActivityBatch, rebatch  # noqa: E402
+from models.rollup import update_rollups  # noqa: E402
+from models.training_load import update_training_state  # noqa: E402
+
+
+PER_PAGE = 200  # Strava の per_page 上限
+MAX_WORKERS = 4  # 同時に投げるページリクエスト数の上限
+
+
+def to_activity_info(activity: Dict[str, Any]) -> Dict[str, Any]:
+    """API のアクティビティ JSON から保存対象のフィールドだけを取り出す"""
+    return {
+        "id": activity.get("id"),
+        "name": activity.get("name"),
+        "distance": activity.get("distance"),
+        "moving_time": activity.get("moving_time"),
+        "elapsed_time": activity.get("elapsed_time"),
+        "total_elevation_gain": activity.get("total_elevation_gain"),
+        "type": activity.get("type"),
+        "start_date": activity.get("start_date"),
+        "start_date_local": activity.get("start_date_local"),
+        "timezone": activity.get("timezone"),
+        "utc_offset": activity.get("utc_offset"),
+        "average_speed": activity.get("average_speed"),
+        "max_speed": activity.get("max_speed"),
+        "average_cadence": activity.get("average_cadence"),
+        "average_temp": activity.get("average_temp"),
+        "average_heartrate": activity.get("average_heartrate"),
+        "max_heartrate": activity.get("max_heartrate"),
+    }
 
 
-def save_tokens(json_path: str, token_data: Dict[str, Any]) -> None:
-    """最新のトークン情報を JSON に保存する"""
-    with open(json_path, "w") as f:
-        json.dump(token_data, f, indent=2)
+def fetch_page(
+    access_token: str, page: int = 1, per_page: int = PER_PAGE, after: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """Strava APIからアクティビティ一覧を1ページ分取得（API の JSON のまま。after 指定でそれ以降のみ）"""
+    headers = {"Authorization": f"Bearer {access_token}"}
+    params = {"page": page, "per_page": per_page}
+    if after is not None:
+        params["after"] = after
+    # 共有クライアント経由（keep-alive・レート制御・再試行）
+    response = default_client().get("/athlete/activities", headers=headers, params=params)
+    response.raise_for_status()  # エラーハンドリング
+    return response.json()
 
 
-def create_client(token_data: Dict[str, Any]) -> Client:
-    """stravalib クライアントを生成"""
-    client = Client(
-        access_token=token_data["access_token"],
-        refresh_token=token_data["refresh_token"],
-        token_expires=token_data["expires_at"],
-    )
-    return client
+def fetch_activities(
+    access_token: str, page: int = 1, per_page: int = PER_PAGE, after: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """1ページ分を取得して保存対象のフィールドだけにする"""
+    return [to_activity_info(activity) for activity in fetch_page(access_token, page, per_page, after)]
 
 
-def refresh_and_save_tokens(client: Client, json_path: str) -> Dict[str, Any]:
+def iter_pages(
+    access_token: str,
+    per_page: int = PER_PAGE,
+    max_workers: int = MAX_WORKERS,
+    after: Optional[int] = None,
+) -> Iterator[List[Dict[str, Any]]]:
     """
-    stravalib が自動リフレッシュしたトークンを保存。
-    （有効期限が切れていた場合に備えて）
+    ページをページ順に1つずつ返す（パイプラインの先頭の段）。
+    先読みは max_workers ページまでで、1ページ受け取られるごとに次の1ページを要求する。
+    下流が遅ければ要求も止まるので、手元に溜まるのは最大 max_workers ページ。
+    空ページか満杯でないページ（最終ページ）で終わる。
     """
-    new_token = {
-        "access_token": client.access_token,
-        "refresh_token": client.refresh_token,
-        "expires_at": client.token_expires,
-    }
-    save_tokens(json_path, new_token)
-    return new_token
-
-
-def fetch_activities(access_token: str) -> List[Dict[str, Any]]:
-    """Strava APIからアクティビティ一覧を取得"""
-    url = "https://www.strava.com/api/v3/athlete/activities"
-    headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.get(url, headers=headers)
-    response.raise_for_status()  # エラーハンドリング
-    activities = response.json()
-
-    activities_list: List[Dict[str, Any]] = []
-    for activity in activities:
-        activity_info = {
-            "id": activity.get("id"),
-            "name": activity.get("name"),
-            "distance": activity.get("distance"),
-            "moving_time": activity.get("moving_time"),
-            "elapsed_time": activity.get("elapsed_time"),
-            "total_elevation_gain": activity.get("total_elevation_gain"),
-            "type": activity.get("type"),
-            "start_date": activity.get("start_date"),
-            "start_date_local": activity.get("start_date_local"),
-            "timezone": activity.get("timezone"),
-            "utc_offset": activity.get("utc_offset"),
-            "average_speed": activity.get("average_speed"),
-            "max_speed": activity.get("max_speed"),
-            "average_cadence": activity.get("average_cadence"),
-            "average_temp": activity.get("average_temp"),
-            "average_heartrate": activity.get("average_heartrate"),
-            "max_heartrate": activity.get("max_heartrate"),
-        }
-        activities_list.append(activity_info)
-    return activities_list
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight: Deque[Future] = deque()
+        next_page = 1
+
+        def submit() -> None:
+            nonlocal next_page
+            in_flight.append(executor.submit(fetch_page, access_token, next_page, per_page, after))
+            next_page += 1
+
+        for _ in range(max_workers):
+            submit()
+        try:
+            while in_flight:
+                page = in_flight.popleft().result()
+                if not page:
+                    return
+                submit()
+                yield page
+                if len(page) < per_page:
+                    return
+        finally:
+            # 打ち切り時は先読みの残りを取り消す（実行中のものは結果を捨てる）
+            for future in in_flight:
+                future.cancel()
+
+
+def iter_activities(pages: Iterable[List[Dict[str, Any]]]) -> Iterator[Dict[str, Any]]:
+    """ページを1件ずつにほどき、保存対象のフィールドに正規化する"""
+    for page in pages:
+        for activity in page:
+            yield to_activity_info(activity)
+
+
+def fetch_all_activities(
+    access_token: str,
+    per_page: int = PER_PAGE,
+    max_workers: int = MAX_WORKERS,
+    after: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """全ページを新しい順（API の返却順）に連結したリスト（差分同期のように件数が少ないとき用）"""
+    return list(iter_activities(iter_pages(access_token, per_page, max_workers, after)))
+
+
+def sync_full(
+    access_token: str,
+    uri: str = DATA_STORE_URI,
+    state_path: Optional[str] = None,
+    batch_size: int = BATCH_SIZE,
+    max_workers: int = MAX_WORKERS,
+) -> Dict[str, Any]:
+    """
+    全履歴を取得してストアを作り直す。取得 → 検証 → 列指向に正規化 → 重複除去 → バッチ書き出し を
+    ジェネレータでつなぐので、履歴の長さによらずメモリは一定で、中間の JSON ファイルも作らない。
+    同期状態は state_path（既定はストアごとの状態ファイル）に保存する。
+    """
+    rejected: Counter = Counter()
+    pages = iter_pages(access_token, max_workers=max_workers)
+    # ページごとに検証して列指向のバッチにする（1件ごとの dict は作らない）
+    batches = (ActivityBatch.from_api(list(validate_records(page, rejected))) for page in pages)
+    result = write_batches(rebatch(dedupe_batches(batches, duplicates=rejected), batch_size), uri)
+    if result["newest"]:
+        # 続けて --incremental で差分同期できるようにする
+        write_sync_state(result["newest"], state_path or sync_state_path(uri))
+    print(f"{result['rows']} 件を '{uri}' に書き出しました。", file=sys.stderr)
+    if rejected:
+        print("除外:", dict(rejected), file=sys.stderr)
+    return {**result, "rejected": dict(rejected)}
+
+
+def sync_incremental(
+    access_token: str, uri: str = DATA_STORE_URI, state_path: Optional[str] = None
+) -> Dict[str, Any]:
+    """前回の同期以降のアクティビティだけを取得してストアへマージする（同期状態の既定はストアごとの状態ファイル）"""
+    state_path = state_path or sync_state_path(uri)
+    # 状態ファイルが無ければ既存ストアの最新行から復元する
+    state = load_sync_state(state_path) or save_sync_state(read_store(uri), state_path)
+    after = after_epoch(state)
+    # 差分は通常1ページに収まるので、並列度を上げずに1リクエストで済ませる
+    activities = fetch_all_activities(access_token, max_workers=1 if after else MAX_WORKERS, after=after)
+    merged, added = merge_activities(activities, uri)
+    # 新規分だけロールアップ（日・週・月の集計）に足し込む
+    update_rollups(added, uri, history=merged)
+    # トレーニング負荷も前回の状態から追加分だけ進める
+    update_training_state(added, uri, history=merged)
+    new_state = save_sync_state(merged, state_path)
+    print(f"{len(activities)} 件を取得し（新規 {len(added)} 件）、'{uri}' ({len(merged)} 件) にマージしました。", file=sys.stderr)
+    print("High-water mark:", new_state, file=sys.stderr)
+    return {"fetched": len(activities), "added": len(added), "rows": len(merged)}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Strava のアクティビティを取得する")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="前回同期以降の差分だけを取得し、ストアへ直接マージする",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=DATA_STORE_URI,
+        help="読み書きするストアの URI（全履歴の書き出し先・--incremental のマージ先。同期状態もこのストアごとに持つ）",
+    )
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="まとめて書き出す行数")
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="ストアへは書かず、取得したアクティビティを NDJSON（1行1件）で標準出力へ流す",
+    )
+    args = parser.parse_args()
+    if args.incremental and args.json:
+        parser.error("--incremental と --json は同時に指定できません")
+    return args
 
 
 def main() -> None:
     """エントリーポイント"""
-    # ファイルパス
-    json_path = os.path.join(os.getcwd(), "strava_tokens.json")
-
-    # 1.トークン読み込み
-    token_data = load_tokens(json_path)
-    print("Current expires_at:", token_data["expires_at"])
+    args = parse_args()
 
-    # 2.クライアント生成
-    client = create_client(token_data)
-
-    # 3.ユーザー確認
-    athlete = client.get_athlete()
-    print(f"Hi, {athlete.firstname} Welcome to stravalib!")
-
-    # 4.トークン更新（必要なら）＆保存
-    new_token = refresh_and_save_tokens(client, json_path)
-
-    # 5.アクティビティ取得
-    activities = fetch_activities(new_token["access_token"])
-
-    # 6.結果出力
-    print(json.dumps(activities, indent=4))
+    # 1.トークン取得（期限が近いときだけリフレッシュし、ファイルへ保存される）
+    json_path = os.path.join(os.getcwd(), "strava_tokens.json")
+    access_token = token_manager(json_path).access_token()
+
+    # 2.アクティビティ取得
+    if args.incremental:
+        sync_incremental(access_token, args.output)
+        return
+    if args.json:
+        # 1件ずつ書き出すので全件をメモリに持たない（convert.py はこの形式もそのまま読める）
+        for activity in iter_activities(iter_pages(access_token)):
+            print(json.dumps(activity, ensure_ascii=False))
+        return
+
+    # 3.全履歴をストアへ直接書き出す
+    sync_full(access_token, args.output, batch_size=args.batch_size)
 
 
 if __name__ == "__main__":
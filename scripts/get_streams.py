@@ -0,0 +1,195 @@
+"""
+全アクティビティのストリーム（time / latlng / altitude / heartrate / cadence など）を
+一括ダウンロードしてディスクにキャッシュする。
+
+- 本文は gzip 圧縮した JSON を内容のハッシュ（sha256）名で保存する（content-addressed）
+- どのアクティビティがどのハッシュかは index.jsonl に1行ずつ追記する
+- index にあるものはスキップするので、途中で落ちても再実行で続きから再開でき、
+  取得済みの履歴に対して再実行してもリクエストは発生しない
+
+    $ python3 scripts/get_streams.py --workers 4
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional
+
+from strava_http import DailyLimitExceeded, default_client
+from token_manager import token_manager
+
+# src/ 配下のモデル層（ストア）を利用する
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from config import DATA_STORE_URI, STREAM_CACHE_DIR, STREAM_STORE_DIR  # noqa: E402
+from models.store import read_store  # noqa: E402
+from models.streams import has_streams, write_streams  # noqa: E402
+
+STREAM_KEYS = ["time", "distance", "latlng", "altitude", "heartrate", "cadence", "velocity_smooth"]
+MAX_WORKERS = 4
+
+
+class StreamCache:
+    """ストリームの content-addressed キャッシュ（objects/ と index.jsonl）"""
+
+    def __init__(self, root: str = STREAM_CACHE_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, "index.jsonl")
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self.index: Dict[int, Optional[str]] = self._load_index()
+
+    def _load_index(self) -> Dict[int, Optional[str]]:
+        index: Dict[int, Optional[str]] = {}
+        if not os.path.exists(self.index_path):
+            return index
+        with open(self.index_path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                # 書き込み途中で落ちた最終行を切り捨てる（そのアクティビティは再取得される）
+                data = data[: data.rfind(b"\n") + 1]
+                f.truncate(len(data))
+        for line in data.decode("utf-8").splitlines():
+            entry = json.loads(line)
+            index[int(entry["id"])] = entry.get("sha256")
+        return index
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.json.gz")
+
+    def has(self, activity_id: int) -> bool:
+        """取得済みか（ストリームが無いアクティビティも「取得済み」として記録する）"""
+        if activity_id not in self.index:
+            return False
+        digest = self.index[activity_id]
+        return digest is None or os.path.exists(self.object_path(digest))
+
+    def put(self, activity_id: int, streams: Optional[Dict[str, Any]]) -> Optional[str]:
+        """本文を保存してから index に追記する（順序が逆だと壊れたエントリが残る）"""
+        digest = None
+        if streams is not None:
+            payload = json.dumps(streams, sort_keys=True, separators=(",", ":")).encode("utf-8")
+            digest = hashlib.sha256(payload).hexdigest()
+            path = self.object_path(digest)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    # mtime=0 で同じ内容なら同じバイト列になるようにする
+                    f.write(gzip.compress(payload, mtime=0))
+                os.replace(tmp_path, path)
+        with self._lock:
+            with open(self.index_path, "a") as f:
+                f.write(json.dumps({"id": activity_id, "sha256": digest}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.index[activity_id] = digest
+        return digest
+
+    def get(self, activity_id: int) -> Optional[Dict[str, Any]]:
+        """キャッシュ済みのストリーム（key_by_type 形式の dict）。無ければ None"""
+        digest = self.index.get(activity_id)
+        if digest is None:
+            return None
+        with gzip.open(self.object_path(digest), "rb") as f:
+            return json.loads(f.read())
+
+
+def fetch_streams(access_token: str, activity_id: int) -> Optional[Dict[str, Any]]:
+    """1アクティビティ分のストリームを取得（手動登録などでストリームが無ければ None）"""
+    response = default_client().get(
+        f"/activities/{activity_id}/streams",
+        headers={"Authorization": f"Bearer {access_token}"},
+        params={"keys": ",".join(STREAM_KEYS), "key_by_type": "true"},
+    )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+
+def download_streams(
+    access_token: str,
+    activity_ids: Iterable[int],
+    cache: StreamCache,
+    max_workers: int = MAX_WORKERS,
+) -> Dict[str, int]:
+    """
+    未取得の ID だけを並列に取得してキャッシュする。
+    1件の失敗で他の結果を捨てないよう、取得できたものはその都度キャッシュし、失敗は数えて次回に回す。
+    """
+    pending: List[int] = [int(i) for i in activity_ids if not cache.has(int(i))]
+    stats = {"downloaded": 0, "empty": 0, "failed": 0}
+    if not pending:
+        return stats
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch_streams, access_token, i): i for i in pending}
+        for future in as_completed(futures):
+            activity_id = futures[future]
+            if future.cancelled():
+                stats["failed"] += 1
+                continue
+            try:
+                streams = future.result()
+            except DailyLimitExceeded as e:
+                # 日次上限に達したら、まだ始まっていないリクエストは送らない（実行中のものは結果を受け取る）
+                print(f"{activity_id}: {e}", file=sys.stderr)
+                stats["failed"] += 1
+                for other in futures:
+                    other.cancel()
+                continue
+            except Exception as e:  # 1件の失敗で他の取得を止めない
+                print(f"{activity_id}: ストリームの取得に失敗しました: {e!r}", file=sys.stderr)
+                stats["failed"] += 1
+                continue
+            cache.put(activity_id, streams)
+            stats["downloaded" if streams is not None else "empty"] += 1
+    return stats
+
+
+def build_stream_store(cache: StreamCache, activity_ids: Iterable[int], root: str = STREAM_STORE_DIR) -> int:
+    """キャッシュ済みの JSON を numpy のストリームストアへ変換する（変換済みはスキップ）"""
+    converted = 0
+    for activity_id in activity_ids:
+        if has_streams(activity_id, root):
+            continue
+        streams = cache.get(activity_id)
+        if streams is None or "time" not in streams:
+            continue
+        write_streams(activity_id, streams, root)
+        converted += 1
+    return converted
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="アクティビティのストリームを一括取得してキャッシュする")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="同時リクエスト数")
+    parser.add_argument("--cache-dir", default=STREAM_CACHE_DIR)
+    parser.add_argument("--store-dir", default=STREAM_STORE_DIR, help="numpy 形式のストリームストア")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """エントリーポイント"""
+    args = parse_args()
+    cache = StreamCache(args.cache_dir)
+    ids = read_store(DATA_STORE_URI, columns=["id"])["id"].tolist()
+    pending = [i for i in ids if not cache.has(i)]
+    print(f"{len(ids)} 件中 {len(pending)} 件が未取得です。", file=sys.stderr)
+    if pending:
+        access_token = token_manager(os.path.join(os.getcwd(), "strava_tokens.json")).access_token()
+        stats = download_streams(access_token, pending, cache, args.workers)
+        print(
+            f"取得 {stats['downloaded']} 件 / ストリーム無し {stats['empty']} 件 / 失敗 {stats['failed']} 件（次回再取得）",
+            file=sys.stderr,
+        )
+
+    converted = build_stream_store(cache, ids, args.store_dir)
+    print(f"{converted} 件を '{args.store_dir}' に変換しました。", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,18 @@
 # FYI: https://qiita.com/tatsuki-tsuchiyama/items/fb15145029e5e7318bec
-import requests
 from dotenv import load_dotenv
+import argparse
 import os
+import sys
 import json
+from strava_http import default_client
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from config import TOKENS_DIR  # noqa: E402
+from models.athletes import register_athlete  # noqa: E402
+
+parser = argparse.ArgumentParser(description="Strava の認可コードをトークンに交換する")
+parser.add_argument("--club", action="store_true", help="tokens/<athlete_id>.json に保存し、クラブのアスリートとして登録する")
+args = parser.parse_args()
 
 load_dotenv()
 client_id = "179010"
@@ -22,8 +32,8 @@ code = input("URLからコードを貼り付ける： ")
 
 # http://localhost/exchange_token?state=&code=ed7c4bc34a971e83bbccb194c7023d7f4c57ca19&scope=read,activity:read_all,profile:read_all
 
-token = requests.post(
-    url="https://www.strava.com/api/v3/oauth/token",
+token = default_client().post(
+    "/oauth/token",
     data={
         "client_id": client_id,
         "client_secret": client_secret,
@@ -34,7 +44,16 @@ token = requests.post(
 
 strava_token = token.json()
 
-with open("strava_tokens.json", "w") as f:
-    json.dump(strava_token, f, indent=2)
+if args.club:
+    # 複数アスリート：アスリートごとのトークンファイルに保存し、名前を登録する
+    athlete = strava_token["athlete"]
+    os.makedirs(TOKENS_DIR, exist_ok=True)
+    with open(os.path.join(TOKENS_DIR, f"{athlete['id']}.json"), "w") as f:
+        json.dump(strava_token, f, indent=2)
+    register_athlete(athlete["id"], f"{athlete.get('firstname', '')} {athlete.get('lastname', '')}".strip())
+    print(f"アスリート {athlete['id']} を登録しました。")
+else:
+    with open("strava_tokens.json", "w") as f:
+        json.dump(strava_token, f, indent=2)
 
 print(".envにアクセストークンを追加する", strava_token["access_token"])
\ No newline at end of file
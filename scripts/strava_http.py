@@ -0,0 +1,191 @@
+"""
+Strava API 用の共有 HTTP クライアント。
+
+- requests.Session + HTTPAdapter でコネクションを使い回す（keep-alive）
+- X-RateLimit-Limit / X-RateLimit-Usage ヘッダに追従するトークンバケットで
+  15分枠・日次枠を超えないように待つ
+- 429 / 5xx / 接続エラーはジッター付き指数バックオフで再試行する
+
+STRAVA_API_BASE を変えるとローカルのスタブサーバ（fake_strava.py）に向けられる。
+"""
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+STRAVA_API_BASE = os.getenv("STRAVA_API_BASE", "https://www.strava.com/api/v3")
+
+# Strava の既定の上限（ヘッダを受け取るまではこの値で制御する）
+DEFAULT_LIMITS = (200, 2000)  # (15分, 1日)
+SHORT_WINDOW = 15 * 60
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class DailyLimitExceeded(RuntimeError):
+    """日次のリクエスト上限に達した（翌日 UTC 0 時まで再開できない）"""
+
+
+def _parse_pair(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    # "200,2000" -> (200, 2000)
+    if not value:
+        return None
+    try:
+        short, daily = (int(v) for v in value.split(",")[:2])
+    except ValueError:
+        return None
+    return short, daily
+
+
+class RateLimiter:
+    """
+    15分枠と日次枠の残りをトークンとして持つトークンバケット。
+    レスポンスヘッダの使用量で毎回補正し、枠の切り替わり（15分ごと・UTC 0 時）で補充する。
+    複数スレッドから共有できる。
+    """
+
+    def __init__(self, limits: Tuple[int, int] = DEFAULT_LIMITS, clock=time.time, sleep=time.sleep):
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._sleep = sleep
+        self.short_limit, self.daily_limit = limits
+        self.short_used = 0
+        self.daily_used = 0
+        now = clock()
+        self._short_window = self._short_window_of(now)
+        self._day = self._day_of(now)
+
+    @staticmethod
+    def _short_window_of(now: float) -> int:
+        # Strava の15分枠は時計の 0/15/30/45 分で切り替わる
+        return int(now // SHORT_WINDOW)
+
+    @staticmethod
+    def _day_of(now: float) -> int:
+        return int(now // 86400)
+
+    def _roll(self, now: float) -> None:
+        window, day = self._short_window_of(now), self._day_of(now)
+        if window != self._short_window:
+            self._short_window, self.short_used = window, 0
+        if day != self._day:
+            self._day, self.daily_used = day, 0
+
+    def acquire(self) -> None:
+        """1リクエスト分のトークンを取る。15分枠が尽きていれば次の枠まで待つ"""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._roll(now)
+                if self.daily_used >= self.daily_limit:
+                    raise DailyLimitExceeded(
+                        f"日次上限 {self.daily_limit} 件に達しました（UTC 0 時にリセット）"
+                    )
+                if self.short_used < self.short_limit:
+                    self.short_used += 1
+                    self.daily_used += 1
+                    return
+                wait = (self._short_window + 1) * SHORT_WINDOW - now
+            print(f"15分枠の上限に達したので {wait:.0f} 秒待ちます", file=sys.stderr)
+            self._sleep(max(wait, 0) + 1)
+
+    def update(self, headers: Dict[str, str]) -> None:
+        """レスポンスヘッダの上限・使用量で手元のカウンタを補正する"""
+        limits = _parse_pair(headers.get("X-RateLimit-Limit"))
+        usage = _parse_pair(headers.get("X-RateLimit-Usage"))
+        with self._lock:
+            self._roll(self._clock())
+            if limits:
+                self.short_limit, self.daily_limit = limits
+            if usage:
+                # 他のプロセスの使用分も反映されるので大きい方を採用する
+                self.short_used = max(self.short_used, usage[0])
+                self.daily_used = max(self.daily_used, usage[1])
+
+    def exhaust_short_window(self) -> None:
+        """429 を受けたときに、この15分枠はもう使えないものとして扱う"""
+        with self._lock:
+            self.short_used = self.short_limit
+
+
+class StravaHTTP:
+    """コネクションプール・レート制御・再試行付きの Strava API クライアント"""
+
+    def __init__(
+        self,
+        base_url: str = STRAVA_API_BASE,
+        pool_size: int = 16,
+        max_retries: int = 5,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+        timeout: float = 30.0,
+        limiter: Optional[RateLimiter] = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.limiter = limiter or RateLimiter()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def url(self, path: str) -> str:
+        return path if path.startswith("http") else f"{self.base_url}/{path.lstrip('/')}"
+
+    def _backoff(self, attempt: int) -> float:
+        # フルジッター付き指数バックオフ
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def request(self, method: str, path: str, **kwargs: Any) -> requests.Response:
+        """リクエストを送る。429 / 5xx / 接続エラーは max_retries 回まで再試行する"""
+        kwargs.setdefault("timeout", self.timeout)
+        rate_limited = False
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            if rate_limited:
+                # 429 の後は枠の切り替わりを待った全スレッドが同時に起きるので、送る前にジッターを入れてずらす
+                time.sleep(self._backoff(attempt))
+                rate_limited = False
+            try:
+                response = self.session.request(method, self.url(path), **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._backoff(attempt))
+                continue
+            self.limiter.update(response.headers)
+            if response.status_code not in RETRY_STATUS or attempt == self.max_retries:
+                return response
+            if response.status_code == 429:
+                # 15分枠を使い切った扱いにして、次の acquire で枠の切り替わりまで待たせ、その後ジッター分待つ
+                self.limiter.exhaust_short_window()
+                rate_limited = True
+            else:
+                time.sleep(self._backoff(attempt))
+        return response
+
+    def get(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+
+_default_client: Optional[StravaHTTP] = None
+_default_lock = threading.Lock()
+
+
+def default_client() -> StravaHTTP:
+    """プロセス内で共有するクライアント（レート制御の予算も共有される）"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = StravaHTTP()
+        return _default_client
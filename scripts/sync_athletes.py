@@ -0,0 +1,98 @@
+"""
+クラブの全アスリートを差分同期する。
+
+tokens/<athlete_id>.json があるアスリートを対象に、ワーカープールで並列に
+get_activity.sync_incremental を実行する。HTTP は共有クライアント（strava_http.default_client）
+を通すので、15分枠・日次枠の予算はワーカー全体で共有される。
+同期が終わったら、ランキング用のクラブ集計（club_rollups.csv）を同期した人の分だけ更新する。
+
+    $ python3 scripts/sync_athletes.py --workers 8
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List
+
+from get_activity import sync_incremental
+from strava_http import DailyLimitExceeded
+from token_manager import token_manager
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from config import ATHLETES_DIR, DATA_STORE_URI, SYNC_WORKERS, TOKENS_DIR  # noqa: E402
+from models.athletes import athlete_store_uri, athlete_sync_state_path, update_club_rollups  # noqa: E402
+
+
+def token_path(athlete_id: int, tokens_dir: str = TOKENS_DIR) -> str:
+    return os.path.join(tokens_dir, f"{athlete_id}.json")
+
+
+def list_athletes(tokens_dir: str = TOKENS_DIR) -> List[int]:
+    """トークンファイルのあるアスリート ID"""
+    if not os.path.isdir(tokens_dir):
+        return []
+    names = (os.path.splitext(name) for name in os.listdir(tokens_dir))
+    return sorted(int(stem) for stem, ext in names if ext == ".json" and stem.isdigit())
+
+
+def access_token_for(athlete_id: int, tokens_dir: str = TOKENS_DIR) -> str:
+    """アスリートのアクセストークン（期限が近いときだけリフレッシュされる）"""
+    return token_manager(token_path(athlete_id, tokens_dir)).access_token()
+
+
+def sync_athlete(athlete_id: int, base_uri: str = DATA_STORE_URI, tokens_dir: str = TOKENS_DIR) -> Dict[str, Any]:
+    """1人分を自分のパーティションへ差分同期する"""
+    uri = athlete_store_uri(athlete_id, base_uri)
+    state_path = athlete_sync_state_path(athlete_id, base_uri)
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    return sync_incremental(access_token_for(athlete_id, tokens_dir), uri, state_path)
+
+
+def sync_all(
+    athlete_ids: List[int], base_uri: str = DATA_STORE_URI, tokens_dir: str = TOKENS_DIR, workers: int = SYNC_WORKERS
+) -> Dict[str, List[int]]:
+    """
+    全員をワーカープールで同期する。日次上限に達したら残りは次回に回す
+    （その時点までに同期できた人の分だけクラブ集計を更新する）。
+    """
+    done: List[int] = []
+    failed: List[int] = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(sync_athlete, i, base_uri, tokens_dir): i for i in athlete_ids}
+        for future in as_completed(futures):
+            athlete_id = futures[future]
+            try:
+                future.result()
+                done.append(athlete_id)
+            except DailyLimitExceeded as e:
+                print(f"{athlete_id}: {e}", file=sys.stderr)
+                failed.append(athlete_id)
+            except Exception as e:  # 1人の失敗で他の同期を止めない
+                print(f"{athlete_id}: 同期に失敗しました: {e!r}", file=sys.stderr)
+                failed.append(athlete_id)
+    if done:
+        update_club_rollups(done, base_uri, ATHLETES_DIR)
+    return {"done": sorted(done), "failed": sorted(failed)}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="クラブの全アスリートを差分同期する")
+    parser.add_argument("--workers", type=int, default=SYNC_WORKERS, help="同時に同期するアスリート数")
+    parser.add_argument("--tokens-dir", default=TOKENS_DIR)
+    parser.add_argument("athletes", nargs="*", type=int, help="対象のアスリート ID（省略時は全員）")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """エントリーポイント"""
+    args = parse_args()
+    athlete_ids = args.athletes or list_athletes(args.tokens_dir)
+    result = sync_all(athlete_ids, DATA_STORE_URI, args.tokens_dir, args.workers)
+    print(f"同期 {len(result['done'])} 人 / 失敗 {len(result['failed'])} 人", file=sys.stderr)
+    if result["failed"]:
+        print("失敗:", " ".join(map(str, result["failed"])), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,28 @@
 import os
-import requests
 from dotenv import load_dotenv
+from strava_http import default_client
+from token_manager import token_manager
 
 def check_strava_auth() -> None:
     """Strava API 認証確認"""
     load_dotenv()
 
-    access_token = os.getenv("STRAVA_TOKEN")
+    # strava_tokens.json があればトークンマネージャ経由（期限が近いときだけリフレッシュ）
+    json_path = os.path.join(os.getcwd(), "strava_tokens.json")
+    if os.path.exists(json_path):
+        access_token = token_manager(json_path).access_token()
+    else:
+        access_token = os.getenv("STRAVA_TOKEN")
     refresh_token = os.getenv("REFRESH_TOKEN")
     client_id = os.getenv("STRAVA_CLIENT_ID")
     client_secret = os.getenv("STRAVA_CLIENT_SECRET")
 
+    http = default_client()
+
     # 1️⃣ 現在の access_token で認証テスト
-    url = "https://www.strava.com/api/v3/athlete"
+    url = "/athlete"
     headers = {"Authorization": f"Bearer {access_token}"}
-    response = requests.get(url, headers=headers)
+    response = http.get(url, headers=headers)
 
     if response.status_code == 200:
         athlete = response.json()
@@ -26,14 +34,14 @@ def check_strava_auth() -> None:
         print("レスポンス:", response.text)
 
         # 2️⃣ トークンをリフレッシュ
-        refresh_url = "https://www.strava.com/api/v3/oauth/token"
+        refresh_url = "/oauth/token"
         data = {
             "client_id": client_id,
             "client_secret": client_secret,
             "grant_type": "refresh_token",
             "refresh_token": refresh_token,
         }
-        refresh_res = requests.post(refresh_url, data=data)
+        refresh_res = http.post(refresh_url, data=data)
 
         if refresh_res.status_code == 200:
             new_data = refresh_res.json()
@@ -42,7 +50,7 @@ def check_strava_auth() -> None:
 
             # 3️⃣ 新しいトークンで再度確認
             headers = {"Authorization": f"Bearer {new_token}"}
-            retry = requests.get(url, headers=headers)
+            retry = http.get(url, headers=headers)
             if retry.status_code == 200:
                 athlete = retry.json()
                 print("✅ 再認証成功!")
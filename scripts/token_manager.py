@@ -0,0 +1,122 @@
+"""
+Strava のトークン管理。
+
+- expires_at を手元で確認し、期限が近いときだけ /oauth/token でリフレッシュする
+  （有効なうちは API を呼ばない）
+- リフレッシュはトークンファイルごとのファイルロック（fcntl.flock）の中で行い、
+  ロックを取ったらファイルを読み直す。先に誰かが更新していればそれを使うので、
+  並列のワーカーやプロセスが同時にリフレッシュすることはない（single-flight）
+- 書き込みは一時ファイル + fsync + os.replace で行い、途中で落ちても壊れたファイルを残さない
+"""
+import fcntl
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+from strava_http import StravaHTTP, default_client
+
+TOKEN_PATH = "strava_tokens.json"
+# 期限のこの秒数前からリフレッシュする
+REFRESH_MARGIN = 10 * 60
+
+
+class TokenRefreshError(RuntimeError):
+    """リフレッシュトークンでの更新に失敗した"""
+
+
+def read_tokens(path: str) -> Dict[str, Any]:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_tokens(path: str, token_data: Dict[str, Any]) -> None:
+    """同じディレクトリの一時ファイルに書いてから置き換える"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(token_data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class TokenManager:
+    """1つのトークンファイルを管理する（スレッド間・プロセス間で安全）"""
+
+    def __init__(
+        self,
+        path: str = TOKEN_PATH,
+        client_id: Optional[str] = None,
+        client_secret: Optional[str] = None,
+        http: Optional[StravaHTTP] = None,
+        margin: int = REFRESH_MARGIN,
+        clock=time.time,
+    ):
+        load_dotenv()
+        self.path = path
+        self.client_id = client_id or os.getenv("STRAVA_CLIENT_ID")
+        self.client_secret = client_secret or os.getenv("STRAVA_CLIENT_SECRET")
+        self.http = http
+        self.margin = margin
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._token: Optional[Dict[str, Any]] = None
+
+    def _fresh(self, token: Optional[Dict[str, Any]]) -> bool:
+        return token is not None and token.get("expires_at", 0) - self._clock() > self.margin
+
+    def token(self) -> Dict[str, Any]:
+        """有効なトークン（期限が近ければリフレッシュしたもの）"""
+        if self._fresh(self._token):
+            return self._token
+        with self._lock:
+            # 他のスレッドが待っている間に更新していればそれを使う
+            if self._fresh(self._token):
+                return self._token
+            token = read_tokens(self.path)
+            if not self._fresh(token):
+                token = self._refresh_locked()
+            self._token = token
+            return token
+
+    def access_token(self) -> str:
+        return self.token()["access_token"]
+
+    def _refresh_locked(self) -> Dict[str, Any]:
+        # プロセス間の single-flight：ロックを取ったら読み直し、まだ古ければ自分が更新する
+        with open(self.path + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                token = read_tokens(self.path)
+                if self._fresh(token):
+                    return token
+                response = (self.http or default_client()).post("/oauth/token", data={
+                    "client_id": self.client_id,
+                    "client_secret": self.client_secret,
+                    "grant_type": "refresh_token",
+                    "refresh_token": token["refresh_token"],
+                })
+                if response.status_code != 200:
+                    raise TokenRefreshError(f"トークン更新に失敗しました: {response.status_code} {response.text}")
+                new = response.json()
+                # リフレッシュの応答には athlete などが無いので、元の項目に上書きする
+                token.update({k: new[k] for k in ("access_token", "refresh_token", "expires_at") if k in new})
+                write_tokens(self.path, token)
+                return token
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_managers: Dict[str, TokenManager] = {}
+_managers_lock = threading.Lock()
+
+
+def token_manager(path: str = TOKEN_PATH) -> TokenManager:
+    """パスごとに共有する TokenManager（同じファイルを扱うスレッドはメモリ上のトークンも共有する）"""
+    key = os.path.abspath(path)
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = TokenManager(path)
+        return _managers[key]
@@ -1,45 +1,153 @@
+import pandas as pd
 import streamlit as st
-from models.activities import load_activities, latest_n, top3_by, prepare_chart_source, prepare_summary_source
-from views.tables import show_table, show_title
+import instrument
+from instrument import span
+from models.activities import (
+    chart_source_from_store, load_latest_n, top_k_from_store, prepare_chart_source, summary_from_store
+)
+from models.training_load import training_summary_from_store
+from models.best_efforts import best_effort_leaders_from_store, stream_store_version
+from models.athletes import athlete_store_uri, club_leaderboard, club_rollups_path, load_registry, read_club_rollups
+from models.store import ACTIVITY_COLUMNS, count_rows, load_page, store_version
+from views.tables import show_paged_table, show_table, show_title
 from views.chart import activity_distance_bar
 from views.summary import show_summary
-from config import LATEST_N
+from views.debug import show_debug_panel
+from config import CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, DATA_STORE_URI, LATEST_N, METRICS_PATH, STREAM_STORE_DIR
 
 # キャッシュ：I/Oコストや再計算を抑制
-@st.cache_data(show_spinner=False)
-def _load_df():
-    return load_activities()
+# 各関数は version（ストアの mtime/サイズ）を引数に取るので、同期でストアが
+# 更新されると別キーになり再計算される。古いエントリは max_entries で追い出す
+_cache = st.cache_data(show_spinner=False, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS)
+
+@_cache
+def _load_latest(version: str, n: int, uri: str):
+    # 全履歴は読まず、新しい順のストアから先頭 n 件だけを読む
+    return load_latest_n(n, uri)
+
+@_cache
+def _top_k(version: str, cols: tuple, k: int, n: int, uri: str):
+    # 複数指標の上位 k 件をまとめて取り出す（SQLite では ORDER BY ... LIMIT）
+    return top_k_from_store(cols, k, n, uri)
+
+# グラフの範囲（None は直近 LATEST_N 件、"all" は全履歴、数値は日数）
+CHART_RANGES = {f"Latest {LATEST_N} activities": None, "3 months": 90, "1 year": 365, "All time": "all"}
+
+@_cache
+def _chart_source(version: str, n: int, days, today: str, uri: str):
+    # 範囲が長くても期間×種別に集計するので、描画する点数は一定以下に収まる
+    if days is None:
+        return prepare_chart_source(_load_latest(version, n, uri))
+    if days == "all":
+        return chart_source_from_store(uri=uri)
+    end = pd.Timestamp(today, tz="UTC") + pd.Timedelta(days=1)
+    return chart_source_from_store(end - pd.Timedelta(days=days), end, uri)
+
+@_cache
+def _summary(version: str, n: int, today: str, uri: str):
+    # 今月・今週は日付で変わるので日付もキーに含める
+    return summary_from_store(n, uri)
+
+@_cache
+def _best_effort_leaders(version: str, streams_version: str, k: int, uri: str):
+    # 全履歴のベストエフォート（アクティビティごとの結果はストリームストアにキャッシュされる）
+    return best_effort_leaders_from_store(k, uri)
+
+@_cache
+def _training(version: str, today: str, uri: str):
+    # 同期時に保存した状態を今日まで減衰させるだけ（無ければ全履歴から作る）
+    return training_summary_from_store(uri)
+
+@_cache
+def _page(version: str, offset: int, limit: int, columns: tuple, uri: str):
+    # 表示するページ・列だけをストアから読む（SQLite は LIMIT/OFFSET、Arrow はスライス）
+    return load_page(offset, limit, uri, columns)
+
+@_cache
+def _count(version: str, uri: str):
+    return count_rows(uri)
+
+@_cache
+def _club_leaderboards(club_version: str, today: str, k: int):
+    # 同期時に作ったクラブ集計（アスリート × 週/月）から引くので、各アスリートのストアは読まない
+    # まだ誰も同期していなければ集計が無いので空（表は出さない）
+    club, registry = read_club_rollups(), load_registry()
+    if club.empty:
+        return {}
+    return {grain: club_leaderboard(club, grain, "distance", k, registry=registry) for grain in ("week", "month")}
+
+def _select_store():
+    # 登録済みのアスリートがいれば選んだ人のパーティションだけを読む（いなければ従来の1人用ストア）
+    registry = load_registry()
+    if not registry:
+        return DATA_STORE_URI, registry
+    athlete_id = st.sidebar.selectbox("Athlete", list(registry), format_func=lambda i: registry[i]["name"] or i)
+    return athlete_store_uri(int(athlete_id)), registry
 
 def main():
+    instrument.start_run()
     show_title("Strava activities")
 
     # Data
-    df_all = _load_df()
-    df_latest = latest_n(df_all, LATEST_N)
-
-    # Top 3 distance
-    top3_distance = top3_by(df_latest, "distance")
-    show_table(f"Top 3 distance activities (Latest {LATEST_N} activities)", top3_distance)
+    with span("stage.store"):
+        uri, registry = _select_store()
+        version = store_version(uri)
 
-    # Top 3 elevation
-    top3_elev = top3_by(df_latest, "total_elevation_gain")
-    show_table(f"Top 3 total_elevation_gain activities (Latest {LATEST_N} activities)", top3_elev)
+    # Top 3 distance / elevation / max heartrate（max_heartrate の欠損は上位判定の対象外）
+    with span("stage.top3"):
+        top3 = _top_k(version, ("distance", "total_elevation_gain", "max_heartrate"), 3, LATEST_N, uri)
+        show_table(f"Top 3 distance activities (Latest {LATEST_N} activities)", top3["distance"])
+        show_table(f"Top 3 total_elevation_gain activities (Latest {LATEST_N} activities)", top3["total_elevation_gain"])
+        show_table(f"Top 3 max heartrate activities (Latest {LATEST_N} activities)", top3["max_heartrate"])
 
-    # Top 3 max heartrate
-    # max_heartrate が欠損あり得るので NaN 対策（必要なら fillna(-inf) 等）
-    top3_hr = top3_by(df_latest.dropna(subset=["max_heartrate"]), "max_heartrate")
-    show_table(f"Top 3 max heartrate activities (Latest {LATEST_N} activities)", top3_hr)
+    # Best efforts（ストリームを取得済みのアクティビティのみ）
+    with span("stage.best_efforts"):
+        best = _best_effort_leaders(version, stream_store_version(STREAM_STORE_DIR), 3, uri)
+        for col, df in best.items():
+            show_table(f"Best {col} efforts (All activities)", df)
 
     # Chart
-    chart_df = prepare_chart_source(df_latest)
-    activity_distance_bar(chart_df, "Each Activity Distance")
+    today = pd.Timestamp.now(tz="Asia/Tokyo").date().isoformat()
+    with span("stage.chart"):
+        chart_range = st.sidebar.selectbox("Chart range", list(CHART_RANGES))
+        chart_df = _chart_source(version, LATEST_N, CHART_RANGES[chart_range], today, uri)
+        activity_distance_bar(chart_df, "Each Activity Distance")
 
     # Summary
-    summary_df = prepare_summary_source(df_latest)
-    show_summary("Summary(Total Distance and Elevation)", summary_df)
+    with span("stage.summary"):
+        summary_df = _summary(version, LATEST_N, today, uri)
+        show_summary("Summary(Total Distance and Elevation)", summary_df)
+
+    # Training load
+    with span("stage.training"):
+        show_summary("Training load (TRIMP based)", _training(version, today, uri))
+
+    # Club leaderboards（複数アスリート時のみ）
+    if registry:
+        with span("stage.club"):
+            club = _club_leaderboards(store_version(club_rollups_path()), today, 10)
+            if not club:
+                st.caption("Club leaderboard: no synced athletes yet (run scripts/sync_athletes.py)")
+            else:
+                show_table("Club leaderboard: distance this week", club["week"])
+                show_table("Club leaderboard: distance this month", club["month"])
+
+    # All activities（1ページ目が直近 LATEST_N 件）
+    with span("stage.activities"):
+        show_paged_table(
+            "Activities",
+            lambda offset, limit, columns: _page(version, offset, limit, columns, uri),
+            _count(version, uri),
+            ACTIVITY_COLUMNS,
+            ["start_date_local", "name", "type", "distance", "moving_time", "total_elevation_gain", "average_heartrate"],
+            page_size=LATEST_N,
+        )
 
-    # All activities
-    show_table(f"Latest {LATEST_N} activities", df_latest)
+    # 計測を有効にしているときだけ（DASHBOARD_PROFILE=1）
+    if instrument.enabled():
+        show_debug_panel(instrument.run_spans())
+        if METRICS_PATH:
+            instrument.write_openmetrics(METRICS_PATH)
 
 if __name__ == "__main__":
     main()
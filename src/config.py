@@ -1,2 +1,40 @@
-DATA_CSV_PATH = "tmp_csv/activities.csv"
-LATEST_N = 30
\ No newline at end of file
+import os
+
+# アクティビティストアの URI（拡張子またはスキームでバックエンドを選ぶ）
+#   tmp_csv/activities.csv      -> CSV
+#   tmp_csv/activities.parquet  -> Parquet（型付き・列単位で読み込み）
+#   tmp_csv/activities.arrow    -> Arrow IPC（メモリマップで読み込み）
+#   tmp_csv/activities.db       -> SQLite（インデックス付きクエリ）
+# 同期状態・ロールアップなどの付随ファイルはストアのパスに接尾辞を付けて置く（例: activities.csv.sync_state.json）
+DATA_STORE_URI = os.getenv("DATA_STORE_URI", "tmp_csv/activities.csv")
+
+# 複数アスリート：ストアは tmp_csv/athletes/<athlete_id>/ に分け、トークンは tokens/<athlete_id>.json に置く
+ATHLETES_DIR = "tmp_csv/athletes"
+TOKENS_DIR = "tokens"
+SYNC_WORKERS = 8
+LATEST_N = 30
+
+# トレーニング負荷（TRIMP）の計算に使う安静時・最大心拍
+HR_REST = 60
+HR_MAX = 190
+
+# アクティビティごとのストリーム（時系列）のキャッシュ
+STREAM_CACHE_DIR = "tmp_cache/streams"
+# ストリームをチャンネルごとの numpy 配列にしたもの（メモリマップで読む）
+STREAM_STORE_DIR = "tmp_cache/stream_store"
+
+# グラフ：この件数まではアクティビティごとの棒、超えたら期間×種別に集計して約 CHART_MAX_POINTS 期間に抑える
+CHART_MAX_BARS = 200
+CHART_MAX_POINTS = 120
+
+# 静的スナップショット（src/snapshot.py）の出力先
+SNAPSHOT_DIR = "tmp_snapshot"
+
+# ダッシュボードのキャッシュ（ストアのバージョンごとに保持し、古いものから捨てる）
+CACHE_MAX_ENTRIES = 64
+CACHE_TTL_SECONDS = 24 * 60 * 60
+
+# 処理区間の計測（src/instrument.py）。1 で有効にし、サイドバーにデバッグパネルを出す
+PROFILE_ENABLED = os.getenv("DASHBOARD_PROFILE") == "1"
+# 設定すると、実行ごとに OpenMetrics のテキストをこのパスへ書き出す
+METRICS_PATH = os.getenv("DASHBOARD_METRICS_PATH")
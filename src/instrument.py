@@ -0,0 +1,171 @@
+"""
+ダッシュボードの処理区間（span）の計測。
+
+    with span("load") as s:
+        df = ...
+        s.rows_out = len(df)
+
+    @traced("models.top_k_by")
+    def top_k_by(df, ...): ...
+
+計測は既定で無効で、そのときの span() は共有の nullcontext を返し、traced はフラグを1つ見るだけになる。
+DASHBOARD_PROFILE=1（config.PROFILE_ENABLED）で有効になり、区間ごとの経過時間・入出力行数・フロントエンドへ送ったバイト数を記録する。
+記録はスクリプト実行（スレッド）ごとの一覧と、プロセス全体の累計（OpenMetrics で出力）の両方に残る。
+"""
+import functools
+import os
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+from config import PROFILE_ENABLED
+
+_enabled = PROFILE_ENABLED
+_NOOP = nullcontext()
+_local = threading.local()
+_totals: Dict[str, Dict[str, float]] = {}
+_totals_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(on: bool = True) -> None:
+    global _enabled
+    _enabled = on
+
+
+class Span:
+    __slots__ = ("name", "rows_in", "rows_out", "bytes_out", "start", "seconds", "depth")
+
+    def __init__(self, name: str, rows_in: Optional[int] = None):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out: Optional[int] = None
+        self.bytes_out: Optional[int] = None
+        self.seconds = 0.0
+
+    def __enter__(self) -> "Span":
+        stack = _stack()
+        self.depth = len(stack)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.seconds = time.perf_counter() - self.start
+        _stack().pop()
+        _spans().append(self)
+        with _totals_lock:
+            total = _totals.setdefault(self.name, {"count": 0, "seconds": 0.0, "rows_in": 0, "rows_out": 0, "bytes": 0})
+            total["count"] += 1
+            total["seconds"] += self.seconds
+            total["rows_in"] += self.rows_in or 0
+            total["rows_out"] += self.rows_out or 0
+            total["bytes"] += self.bytes_out or 0
+
+
+def _stack() -> List[Span]:
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _spans() -> List[Span]:
+    if not hasattr(_local, "spans"):
+        _local.spans = []
+    return _local.spans
+
+
+def span(name: str, rows_in: Optional[int] = None):
+    """計測区間。無効時は何もしない共有のコンテキストを返す"""
+    if not _enabled:
+        return _NOOP
+    return Span(name, rows_in)
+
+
+def count_rows(value: Any) -> Optional[int]:
+    """DataFrame（または DataFrame の dict）の行数"""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    if isinstance(value, dict) and value and all(isinstance(v, pd.DataFrame) for v in value.values()):
+        return sum(len(v) for v in value.values())
+    return None
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """関数全体を span で囲む。最初の DataFrame 引数を入力行数、戻り値を出力行数として記録する"""
+
+    def decorator(fn: Callable) -> Callable:
+        label = name or f"{fn.__module__}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _enabled:
+                return fn(*args, **kwargs)
+            rows_in = next((count_rows(a) for a in args if isinstance(a, pd.DataFrame)), None)
+            with Span(label, rows_in) as s:
+                result = fn(*args, **kwargs)
+                s.rows_out = count_rows(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def dataframe_bytes(df: pd.DataFrame) -> int:
+    """st.dataframe が送る量の目安（Arrow IPC にしたときのバイト数）"""
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().size
+
+
+def start_run() -> None:
+    """スクリプト実行の開始時に、この実行の区間一覧を空にする"""
+    _local.spans = []
+    _local.stack = []
+
+
+def run_spans() -> pd.DataFrame:
+    """この実行で記録した区間（終了順。depth は入れ子の深さ）"""
+    return pd.DataFrame(
+        [(s.name, s.depth, s.seconds * 1000, s.rows_in, s.rows_out, s.bytes_out) for s in _spans()],
+        columns=["span", "depth", "ms", "rows_in", "rows_out", "bytes_out"],
+    )
+
+
+def openmetrics() -> str:
+    """プロセス全体の累計を OpenMetrics のテキスト形式で返す"""
+    with _totals_lock:
+        totals = {name: dict(t) for name, t in sorted(_totals.items())}
+
+    def label(name: str) -> str:
+        return name.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    lines = ["# TYPE dashboard_span_seconds summary", "# UNIT dashboard_span_seconds seconds"]
+    for name, t in totals.items():
+        lines.append(f'dashboard_span_seconds_count{{span="{label(name)}"}} {t["count"]}')
+        lines.append(f'dashboard_span_seconds_sum{{span="{label(name)}"}} {t["seconds"]:.6f}')
+    for metric, key in (("rows_in", "rows_in"), ("rows_out", "rows_out"), ("bytes_sent", "bytes")):
+        lines.append(f"# TYPE dashboard_span_{metric} counter")
+        for name, t in totals.items():
+            lines.append(f'dashboard_span_{metric}_total{{span="{label(name)}"}} {t[key]}')
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+def write_openmetrics(path: str) -> None:
+    """テキストファイルとして書き出す（node_exporter の textfile collector などで拾える）"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(openmetrics())
+    os.replace(tmp_path, path)
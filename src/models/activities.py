@@ -1,52 +1,170 @@
+import os
+import numpy as np
 import pandas as pd
-from typing import Tuple
-from config import DATA_CSV_PATH, LATEST_N
-
-def load_activities(path: str = DATA_CSV_PATH) -> pd.DataFrame:
-    df = pd.read_csv(path)
-    # 時系列並びを保証（start_date_local を文字列→日時に）
-    df["start_date_local"] = pd.to_datetime(df["start_date_local"])
-    df = df.sort_values("start_date_local", ascending=False).reset_index(drop=True)
+from typing import Dict, Optional, Sequence, Tuple
+from config import CHART_MAX_BARS, CHART_MAX_POINTS, DATA_STORE_URI, LATEST_N
+from instrument import traced
+from models import sqlite_store
+from models.aggregate import bin_by_type, choose_grain, current_period_totals, local_days, period_start
+from models.rollup import read_rollups, current_totals as rollup_current_totals
+from models.store import local_day_number, normalize_types, parse_store_uri, read_store, load_latest, load_window
+
+@traced()
+def load_activities(uri: str = DATA_STORE_URI, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    # 型変換（日時・カテゴリ等）はストア側で行う。columns で読む列を絞れる
+    df = read_store(uri, columns)
+    # 時系列並びを保証（ストアは新しい順で書かれているので通常はソート不要）
+    if "start_date_local" in df.columns and not df["start_date_local"].is_monotonic_decreasing:
+        df = df.sort_values("start_date_local", ascending=False).reset_index(drop=True)
     return df
 
-def latest_n(df: pd.DataFrame, n: int = LATEST_N) -> pd.DataFrame:
-    return df.head(n).copy()
+@traced()
+def load_latest_n(n: int = LATEST_N, uri: str = DATA_STORE_URI) -> pd.DataFrame:
+    # ストアの並び（新しい順）を利用して先頭 n 件だけを読む
+    return load_latest(n, uri)
 
-def top3_by(df: pd.DataFrame, col: str) -> pd.DataFrame:
-    return df.sort_values(by=col, ascending=False).head(3).copy()
+@traced()
+def load_period(start: pd.Timestamp, end: pd.Timestamp, uri: str = DATA_STORE_URI) -> pd.DataFrame:
+    # start <= start_date_local < end の範囲だけを読む
+    return load_window(start, end, uri)
 
-def prepare_chart_source(df: pd.DataFrame) -> pd.DataFrame:
-    # グラフに使う列だけ残すなど、将来の加工の置き場
-    cols = ["start_date_local", "distance", "name"]
-    return df[cols].copy()
+@traced()
+def top_k_from_store(
+    cols: Sequence[str], k: int = 3, n: Optional[int] = LATEST_N, uri: str = DATA_STORE_URI
+) -> Dict[str, pd.DataFrame]:
+    # 直近 n 件（None なら全履歴）の中で各列の上位 k 件（欠損は除外）。SQLite では ORDER BY ... LIMIT に任せる
+    backend, path = parse_store_uri(uri)
+    # ストアが未作成なら下の load_latest / load_activities が空の表を返す
+    if backend == "sqlite" and os.path.exists(path):
+        return {col: normalize_types(sqlite_store.select_top_by(path, col, k, within_latest=n)) for col in cols}
+    df = load_latest(n, uri) if n is not None else load_activities(uri)
+    return top_k_by(df, cols, k)
 
-def prepare_summary_source(df: pd.DataFrame) -> pd.DataFrame:
-    now = pd.Timestamp.now(tz="Asia/Tokyo")
-    # 期間フィルタ
-    this_month = df[df["start_date_local"].dt.month == now.month]
-    this_week = df[df["start_date_local"].dt.isocalendar().week == now.isocalendar().week]
-    latest_30 = df.sort_values("start_date_local", ascending=False).head(30)
+@traced()
+def top_by_from_store(col: str, k: int = 3, n: Optional[int] = LATEST_N, uri: str = DATA_STORE_URI) -> pd.DataFrame:
+    return top_k_from_store([col], k, n, uri)[col]
 
-    # 単位変換（Stravaのdistanceはメートル）
-    for d in (df, this_month, this_week, latest_30):
-        d["distance_km"] = d["distance"] / 1000.0
+@traced()
+def period_bounds(now: Optional[pd.Timestamp] = None) -> Dict[str, Tuple[pd.Timestamp, pd.Timestamp]]:
+    # 今月・今週（月曜始まり）の範囲。start_date_local は現地時刻が UTC として入っているので境界も同じ扱いにする
+    now = now if now is not None else pd.Timestamp.now(tz="Asia/Tokyo")
+    today = now.tz_localize(None).normalize() if now.tzinfo is not None else now.normalize()
+    month_start = today.replace(day=1)
+    week_start = today - pd.Timedelta(days=today.weekday())
+    bounds = {
+        "month": (month_start, month_start + pd.offsets.MonthBegin(1)),
+        "week": (week_start, week_start + pd.Timedelta(days=7)),
+    }
+    return {label: (start.tz_localize("UTC"), end.tz_localize("UTC")) for label, (start, end) in bounds.items()}
 
-    # 各集計
+@traced()
+def summary_from_store(n: int = LATEST_N, uri: str = DATA_STORE_URI, now: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    # 直近 n 件・今月・今週の合計。今月・今週は取り込み時に作ったロールアップがあればそこから引く
+    bounds = period_bounds(now)
+    backend, path = parse_store_uri(uri)
+    totals: Dict[str, Tuple[float, float]] = {}
+    rollups = read_rollups(uri)
+    if not rollups.empty:
+        latest = load_latest(n, uri, ["distance", "total_elevation_gain"])
+        totals["latest"] = (latest["distance"].sum(), latest["total_elevation_gain"].sum())
+        for label, t in rollup_current_totals(rollups, now).items():
+            totals[label] = (t["distance"], t["total_elevation_gain"])
+    elif backend == "sqlite" and os.path.exists(path):
+        # SQLite では範囲スキャン1回の集計クエリに任せる（未作成なら下の分岐で空の合計になる）
+        periods = {label: [local_day_number(t) for t in b] for label, b in bounds.items()}
+        for row in sqlite_store.select_period_totals(path, periods, n).itertuples(index=False):
+            totals[row[0]] = (row[1], row[2])
+    else:
+        frames = {"latest": load_latest(n, uri, ["distance", "total_elevation_gain"])}
+        for label, (start, end) in bounds.items():
+            frames[label] = load_window(start, end, uri, ["distance", "total_elevation_gain"])
+        totals = {label: (f["distance"].sum(), f["total_elevation_gain"].sum()) for label, f in frames.items()}
+    return _summary_frame(totals)
+
+def _summary_frame(totals: Dict[str, Tuple[float, float]]) -> pd.DataFrame:
+    # {latest/month/week: (総距離 m, 総獲得標高 m)} を表示用の表にする
+    labels = {"latest": f"直近{LATEST_N}アクティビティ", "month": "今月", "week": "今週"}
     summary = pd.DataFrame({
-        "対象": ["直近30アクティビティ", "今月", "今週"],
-        "総走行距離 (km)": [
-            latest_30["distance_km"].sum(),
-            this_month["distance_km"].sum(),
-            this_week["distance_km"].sum(),
-        ],
-        "総獲得標高 (m)": [
-            latest_30["total_elevation_gain"].sum(),
-            this_month["total_elevation_gain"].sum(),
-            this_week["total_elevation_gain"].sum(),
-        ]
+        "対象": [labels[k] for k in labels],
+        "総走行距離 (km)": [totals[k][0] / 1000.0 for k in labels],
+        "総獲得標高 (m)": [totals[k][1] for k in labels],
     })
-
     summary["総走行距離 (km)"] = summary["総走行距離 (km)"].round(1)
     summary["総獲得標高 (m)"] = summary["総獲得標高 (m)"].round(0)
+    return summary
+
+@traced()
+def latest_n(df: pd.DataFrame, n: int = LATEST_N) -> pd.DataFrame:
+    return df.head(n).copy()
+
+@traced()
+def top_k_by(df: pd.DataFrame, cols: Sequence[str], k: int = 3) -> Dict[str, pd.DataFrame]:
+    # 列ごとに argpartition で上位 k 件の位置だけを選び（O(n)）、その k 行だけを取り出す
+    # 欠損は -inf 扱いで選ばれず、dropna のコピーも作らない
+    if k <= 0:
+        return {col: df.iloc[:0] for col in cols}
+    result = {}
+    for col in cols:
+        values = df[col].to_numpy(dtype="float64", na_value=-np.inf)
+        if len(values) > k:
+            kth = values[np.argpartition(-values, k - 1)[k - 1]]
+            # k 番目と同値の行は元の並び（新しい順）で先にあるものを優先する
+            above = np.flatnonzero(values > kth)
+            idx = np.concatenate([above, np.flatnonzero(values == kth)[: k - len(above)]])
+        else:
+            idx = np.arange(len(values))
+        idx = idx[np.isfinite(values[idx])]
+        idx = idx[np.lexsort((idx, -values[idx]))]
+        result[col] = df.take(idx)
+    return result
+
+@traced()
+def top3_by(df: pd.DataFrame, col: str) -> pd.DataFrame:
+    return top_k_by(df, [col], 3)[col]
 
-    return summary
\ No newline at end of file
+CHART_COLUMNS = ["start_date_local", "distance", "name", "type"]
+# 集計に使う期間キーも一緒に読む（日時を解釈し直さずに済む）
+_CHART_READ_COLUMNS = CHART_COLUMNS + ["local_day", "local_week", "local_month"]
+
+@traced()
+def prepare_chart_source(
+    df: pd.DataFrame, max_bars: int = CHART_MAX_BARS, max_points: int = CHART_MAX_POINTS
+) -> pd.DataFrame:
+    # max_bars 件まではアクティビティごとの棒、それを超えたら期間×種別に集計して点数を max_points 程度に抑える
+    if len(df) <= max_bars:
+        return df[CHART_COLUMNS].copy()
+    days = local_days(df)
+    return bin_by_type(df, choose_grain(days.min(), days.max(), max_points))
+
+@traced()
+def chart_source_from_store(
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+    uri: str = DATA_STORE_URI,
+    max_points: int = CHART_MAX_POINTS,
+) -> pd.DataFrame:
+    # start..end（start が None なら全履歴）のグラフ用データ
+    if start is not None:
+        end = end if end is not None else pd.Timestamp.max.tz_localize("UTC")
+        return prepare_chart_source(load_window(start, end, uri, _CHART_READ_COLUMNS), max_points=max_points)
+    rollups = read_rollups(uri)
+    if rollups.empty:
+        return prepare_chart_source(load_activities(uri, _CHART_READ_COLUMNS), max_points=max_points)
+    # 全履歴はロールアップ（期間×種別の集計済み）から作るので行を読まない
+    days = rollups.loc[rollups["grain"] == "day", "period"]
+    grain = choose_grain(days.min(), days.max(), max_points)
+    # ロールアップに年は無いので月から作る（月キー // 12 が年キー）
+    source = rollups[rollups["grain"] == ("month" if grain == "year" else grain)]
+    if grain == "year":
+        source = source.assign(period=source["period"] // 12)
+    binned = source.groupby(["period", "type"], as_index=False)[["distance", "count"]].sum()
+    binned.insert(0, "start_date_local", pd.to_datetime(period_start(binned.pop("period").to_numpy(), grain)))
+    return binned
+
+@traced()
+def prepare_summary_source(df: pd.DataFrame, now: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    # 直近30件・今月・今週を整数の期間キーで1パス集計する（df はコピーも変更もしない）
+    totals = current_period_totals(df, now, grains=("month", "week"), latest_n=LATEST_N)
+    return _summary_frame({
+        label: (t["distance"], t["total_elevation_gain"]) for label, t in totals.items()
+    })
@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Optional, Sequence
+
+# 集計対象の列（距離は m のまま集計し、表示時に km へ変換する）
+SUM_COLUMNS = ("distance", "total_elevation_gain")
+
+# 期間キー（1970-01-01 からの通し番号）。年をまたいでも同じ月・週が衝突しない
+GRAINS = ("day", "week", "month", "year")
+# 取り込み時に計算して保存してある期間キーの列（models.store.add_date_keys）
+_KEY_COLUMNS = {"day": "local_day", "week": "local_week", "month": "local_month"}
+
+
+def day_numbers(ts: pd.Series) -> np.ndarray:
+    """日時列を 1970-01-01 からの日数（int64）にする（tz 付きでも UTC の壁時計として扱う）"""
+    return ts.values.astype("datetime64[D]").astype(np.int64)
+
+
+def local_days(df: pd.DataFrame, date_col: str = "start_date_local") -> np.ndarray:
+    """現地日付の日数。保存済みの local_day があればそのまま使い、無ければ date_col から計算する"""
+    if date_col == "start_date_local" and "local_day" in df.columns:
+        return df["local_day"].to_numpy(dtype=np.int64)
+    return day_numbers(df[date_col])
+
+
+def frame_period_keys(df: pd.DataFrame, grain: str, date_col: str = "start_date_local") -> np.ndarray:
+    """df の各行の期間キー。保存済みのキー列（local_week など）があれば日付を解釈し直さない"""
+    col = _KEY_COLUMNS.get(grain)
+    if date_col == "start_date_local" and col in df.columns:
+        return df[col].to_numpy(dtype=np.int64)
+    return period_keys(local_days(df, date_col), grain)
+
+
+def today_number(now: Optional[pd.Timestamp] = None) -> np.ndarray:
+    """now（既定は東京の現在時刻）の壁時計の日付を日数（長さ1の配列）にする"""
+    now = now if now is not None else pd.Timestamp.now(tz="Asia/Tokyo")
+    wall = now.tz_localize(None) if now.tzinfo is not None else now
+    return np.array([wall.to_datetime64()]).astype("datetime64[D]").astype(np.int64)
+
+
+def period_keys(days: np.ndarray, grain: str) -> np.ndarray:
+    """日数から各粒度の期間キーを計算する（週は月曜始まり＝ISO 週と同じ区切り）"""
+    if grain == "day":
+        return days
+    if grain == "week":
+        # 1970-01-01 は木曜日なので +3 で月曜始まりの週番号になる
+        return (days + 3) // 7
+    if grain == "month":
+        return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    if grain == "year":
+        return days.astype("datetime64[D]").astype("datetime64[Y]").astype(np.int64)
+    raise ValueError(f"未知の期間です: {grain}")
+
+
+def _values(df: pd.DataFrame, col: str) -> np.ndarray:
+    # nullable 列の欠損は 0 として合計する
+    return df[col].to_numpy(dtype="float64", na_value=0.0)
+
+
+def aggregate_periods(
+    df: pd.DataFrame,
+    grains: Iterable[str] = ("week", "month"),
+    columns: Sequence[str] = SUM_COLUMNS,
+    date_col: str = "start_date_local",
+) -> Dict[str, pd.DataFrame]:
+    """
+    粒度ごとに、期間キー単位の合計と件数を np.bincount で一括計算する。
+    期間キーは取り込み時に保存したもの（無ければ日付から1回だけ計算）を使い、フィルタ済みのコピーは作らない。
+    """
+    values = {col: _values(df, col) for col in columns}
+    result: Dict[str, pd.DataFrame] = {}
+    for grain in grains:
+        keys = frame_period_keys(df, grain, date_col)
+        if len(keys) == 0:
+            result[grain] = pd.DataFrame(columns=[*columns, "count"])
+            continue
+        base = keys.min()
+        idx = keys - base
+        counts = np.bincount(idx)
+        present = np.flatnonzero(counts)
+        table = {col: np.bincount(idx, weights=v)[present] for col, v in values.items()}
+        table["count"] = counts[present]
+        result[grain] = pd.DataFrame(table, index=pd.Index(present + base, name=grain))
+    return result
+
+
+def current_period_totals(
+    df: pd.DataFrame,
+    now: Optional[pd.Timestamp] = None,
+    grains: Iterable[str] = ("month", "week"),
+    latest_n: Optional[int] = None,
+    columns: Sequence[str] = SUM_COLUMNS,
+    date_col: str = "start_date_local",
+) -> Dict[str, Dict[str, float]]:
+    """
+    now を含む期間（今月・今週など）と直近 latest_n 件の合計を返す。
+    df は新しい順に並んでいる前提（直近 n 件は先頭 n 行）。
+    """
+    today = today_number(now)
+    values = {col: _values(df, col) for col in columns}
+    totals: Dict[str, Dict[str, float]] = {}
+    if latest_n is not None:
+        totals["latest"] = {col: float(v[:latest_n].sum()) for col, v in values.items()}
+    for grain in grains:
+        hit = frame_period_keys(df, grain, date_col) == period_keys(today, grain)[0]
+        totals[grain] = {col: float(v @ hit) for col, v in values.items()}
+    return totals
+
+
+def period_start(keys: np.ndarray, grain: str) -> np.ndarray:
+    """期間キーをその期間の初日（datetime64[D]）に戻す"""
+    keys = np.asarray(keys, dtype=np.int64)
+    if grain == "day":
+        return keys.astype("datetime64[D]")
+    if grain == "week":
+        return (keys * 7 - 3).astype("datetime64[D]")
+    if grain == "month":
+        return keys.astype("datetime64[M]").astype("datetime64[D]")
+    if grain == "year":
+        return keys.astype("datetime64[Y]").astype("datetime64[D]")
+    raise ValueError(f"未知の期間です: {grain}")
+
+
+def choose_grain(first_day: int, last_day: int, max_points: int, grains: Sequence[str] = GRAINS) -> str:
+    """範囲内の期間数が max_points 以下になる最も細かい粒度（どれも超えるなら最も粗い粒度）"""
+    for grain in grains:
+        first, last = period_keys(np.array([first_day, last_day]), grain)
+        if last - first + 1 <= max_points:
+            return grain
+    return grains[-1]
+
+
+def bin_by_type(
+    df: pd.DataFrame, grain: str, column: str = "distance", date_col: str = "start_date_local"
+) -> pd.DataFrame:
+    """期間 × 種別ごとの合計と件数（グラフ用。行数は期間数 × 種別数で頭打ちになる）"""
+    keys = frame_period_keys(df, grain, date_col)
+    binned = pd.DataFrame({
+        "period": keys,
+        "type": df["type"].astype(str).to_numpy(),
+        column: _values(df, column),
+    }).groupby(["period", "type"], as_index=False, sort=True).agg(**{column: (column, "sum"), "count": (column, "size")})
+    binned.insert(0, date_col, pd.to_datetime(period_start(binned.pop("period").to_numpy(), grain)))
+    return binned
@@ -0,0 +1,113 @@
+import json
+import os
+import pandas as pd
+from typing import Any, Dict, Iterable, Optional
+from config import ATHLETES_DIR, DATA_STORE_URI
+from models.aggregate import period_keys, today_number
+from models.rollup import read_rollups
+from models.store import sync_state_path
+
+# クラブ全体のランキング用に持つ粒度（アスリート × 期間の合計だけ）
+CLUB_GRAINS = ("week", "month")
+CLUB_COLUMNS = ["athlete_id", "grain", "period", "distance", "total_elevation_gain", "moving_time", "count"]
+CLUB_DTYPES = {
+    "athlete_id": "int64", "grain": "object", "period": "int64",
+    "distance": "float64", "total_elevation_gain": "float64", "moving_time": "float64", "count": "int64",
+}
+
+
+def athlete_dir(athlete_id: int, root: str = ATHLETES_DIR) -> str:
+    return os.path.join(root, str(athlete_id))
+
+
+def athlete_store_uri(athlete_id: int, base_uri: str = DATA_STORE_URI, root: str = ATHLETES_DIR) -> str:
+    """
+    アスリートごとのストアの URI。バックエンド（拡張子・スキーム）は base_uri と同じにする。
+    例: tmp_csv/activities.parquet -> tmp_csv/athletes/123/activities.parquet
+    """
+    scheme, sep, path = base_uri.rpartition("://")
+    partition = os.path.join(athlete_dir(athlete_id, root), os.path.basename(path))
+    return f"{scheme}{sep}{partition}"
+
+
+def athlete_sync_state_path(athlete_id: int, base_uri: str = DATA_STORE_URI, root: str = ATHLETES_DIR) -> str:
+    return sync_state_path(athlete_store_uri(athlete_id, base_uri, root))
+
+
+def registry_path(root: str = ATHLETES_DIR) -> str:
+    return os.path.join(root, "athletes.json")
+
+
+def load_registry(root: str = ATHLETES_DIR) -> Dict[str, Dict[str, Any]]:
+    """登録済みのアスリート（{athlete_id: {"name": ...}}）。未登録なら空"""
+    path = registry_path(root)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def register_athlete(athlete_id: int, name: str, root: str = ATHLETES_DIR) -> Dict[str, Dict[str, Any]]:
+    registry = load_registry(root)
+    registry[str(athlete_id)] = {"name": name}
+    os.makedirs(root, exist_ok=True)
+    tmp_path = registry_path(root) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(registry, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, registry_path(root))
+    return registry
+
+
+def club_rollups_path(root: str = ATHLETES_DIR) -> str:
+    return os.path.join(root, "club_rollups.csv")
+
+
+def read_club_rollups(root: str = ATHLETES_DIR) -> pd.DataFrame:
+    path = club_rollups_path(root)
+    if not os.path.exists(path):
+        # 誰もまだ同期していないときも、集計・並べ替えができる型の空の表にする
+        return pd.DataFrame(columns=CLUB_COLUMNS).astype(CLUB_DTYPES)
+    return pd.read_csv(path)
+
+
+def athlete_totals(athlete_id: int, base_uri: str = DATA_STORE_URI, root: str = ATHLETES_DIR) -> pd.DataFrame:
+    """1人分のロールアップを種別をまとめて (粒度, 期間) ごとの合計にする"""
+    rollups = read_rollups(athlete_store_uri(athlete_id, base_uri, root))
+    rollups = rollups[rollups["grain"].isin(CLUB_GRAINS)]
+    totals = rollups.groupby(["grain", "period"], as_index=False)[CLUB_COLUMNS[3:]].sum()
+    totals.insert(0, "athlete_id", int(athlete_id))
+    return totals[CLUB_COLUMNS]
+
+
+def update_club_rollups(
+    athlete_ids: Iterable[int], base_uri: str = DATA_STORE_URI, root: str = ATHLETES_DIR
+) -> pd.DataFrame:
+    """同期したアスリートの行だけを差し替えて、クラブ全体の集計を保存する"""
+    ids = [int(i) for i in athlete_ids]
+    club = read_club_rollups(root)
+    frames = [club[~club["athlete_id"].isin(ids)]] + [athlete_totals(i, base_uri, root) for i in ids]
+    club = pd.concat([f for f in frames if not f.empty] or [club.iloc[:0]], ignore_index=True)
+    os.makedirs(root, exist_ok=True)
+    tmp_path = club_rollups_path(root) + ".tmp"
+    club.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, club_rollups_path(root))
+    return club
+
+
+def club_leaderboard(
+    club: pd.DataFrame,
+    grain: str = "week",
+    column: str = "distance",
+    k: int = 10,
+    now: Optional[pd.Timestamp] = None,
+    registry: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> pd.DataFrame:
+    """now を含む期間（今週・今月）の column 上位 k 人"""
+    period = period_keys(today_number(now), grain)[0]
+    hit = club[(club["grain"] == grain) & (club["period"] == period)]
+    if hit.empty:
+        return pd.DataFrame(columns=["athlete_id", "name", column, "count"])
+    top = hit.nlargest(k, column)[["athlete_id", column, "count"]].reset_index(drop=True)
+    names = {int(i): a.get("name") for i, a in (registry or {}).items()}
+    top.insert(1, "name", top["athlete_id"].map(names))
+    return top
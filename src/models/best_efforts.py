@@ -0,0 +1,181 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence
+from config import DATA_STORE_URI, STREAM_STORE_DIR
+from models.store import load_ids
+from models.streams import open_streams, stream_dir, stream_ids
+
+# 距離ごとの最速タイム (秒) と、時間ごとの最長距離 (m)
+BEST_DISTANCES = {"1km": 1000, "5km": 5000, "10km": 10000}
+BEST_DURATIONS = {"1h": 3600}
+CACHE_FILE = "best_efforts.json"
+MAX_WORKERS = 4
+
+
+def best_times_for_distances(time: np.ndarray, distance: np.ndarray, targets: Sequence[float]) -> np.ndarray:
+    """
+    各距離をもっとも短い時間で走った区間の所要秒数（届かない距離は NaN）。
+    累積距離は単調増加なので、各始点から target 先の終点を searchsorted で一括で求める（O(n log n)）。
+    """
+    t = np.asarray(time, dtype=np.float64)
+    d = np.maximum.accumulate(np.nan_to_num(np.asarray(distance, dtype=np.float64)))
+    out = np.full(len(targets), np.nan)
+    for i, target in enumerate(targets):
+        end = np.searchsorted(d, d + target, side="left")
+        valid = end < len(d)
+        if valid.any():
+            out[i] = (t[end[valid]] - t[valid]).min()
+    return out
+
+
+def best_distances_for_durations(time: np.ndarray, distance: np.ndarray, durations: Sequence[float]) -> np.ndarray:
+    """各時間の窓で進めた最長距離 (m)。窓が記録より長ければ NaN"""
+    t = np.asarray(time, dtype=np.float64)
+    d = np.maximum.accumulate(np.nan_to_num(np.asarray(distance, dtype=np.float64)))
+    out = np.full(len(durations), np.nan)
+    if len(t) == 0:
+        return out
+    for i, window in enumerate(durations):
+        # 始点 s から window 秒以内に届く最後のサンプル
+        end = np.searchsorted(t, t + window, side="right") - 1
+        valid = t + window <= t[-1]
+        if valid.any():
+            out[i] = (d[end[valid]] - d[valid]).max()
+    return out
+
+
+def mean_max_curve(time: np.ndarray, distance: np.ndarray, durations: Sequence[float]) -> pd.Series:
+    """時間窓ごとの最大平均速度 (m/s)。critical pace の曲線に使う"""
+    best = best_distances_for_durations(time, distance, durations)
+    return pd.Series(best / np.asarray(durations, dtype=np.float64), index=list(durations))
+
+
+def _cache_key() -> Dict[str, Dict[str, float]]:
+    return {"distances": BEST_DISTANCES, "durations": BEST_DURATIONS}
+
+
+def _read_cache(activity_id: int, root: str) -> Optional[Dict[str, float]]:
+    # ストリームを書き直すとディレクトリごと置き換わるので、キャッシュも一緒に消える
+    path = os.path.join(stream_dir(activity_id, root), CACHE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        cached = json.load(f)
+    return cached["efforts"] if cached.get("key") == _cache_key() else None
+
+
+def _write_cache(activity_id: int, efforts: Dict[str, float], root: str) -> None:
+    path = os.path.join(stream_dir(activity_id, root), CACHE_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"key": _cache_key(), "efforts": efforts}, f)
+    os.replace(tmp_path, path)
+
+
+def activity_best_efforts(activity_id: int, root: str = STREAM_STORE_DIR) -> Dict[str, float]:
+    """1アクティビティのベストエフォート（キャッシュがあればそれを返す）"""
+    cached = _read_cache(activity_id, root)
+    if cached is not None:
+        return cached
+    streams = open_streams(activity_id, root)
+    efforts: Dict[str, float] = {}
+    if "distance" in streams.meta["channels"]:
+        distance = streams.channel("distance")
+        times = best_times_for_distances(streams.time, distance, list(BEST_DISTANCES.values()))
+        dists = best_distances_for_durations(streams.time, distance, list(BEST_DURATIONS.values()))
+        efforts.update(zip(BEST_DISTANCES, times.tolist()))
+        efforts.update(zip(BEST_DURATIONS, dists.tolist()))
+    _write_cache(activity_id, efforts, root)
+    return efforts
+
+
+def best_efforts_table(
+    activity_ids: Iterable[int], root: str = STREAM_STORE_DIR, max_workers: int = MAX_WORKERS
+) -> pd.DataFrame:
+    """
+    アクティビティごとのベストエフォート（id と BEST_DISTANCES / BEST_DURATIONS の列）。
+    ストリームの無い id は除き、キャッシュの無いものだけをプロセスプールで計算する。
+    """
+    # アクティビティごとに stat せず、ストアのディレクトリ一覧と突き合わせる
+    stored = set(stream_ids(root))
+    ids = [i for i in activity_ids if i in stored]
+    rows: Dict[int, Dict[str, float]] = {}
+    pending: List[int] = []
+    for activity_id in ids:
+        cached = _read_cache(activity_id, root)
+        if cached is None:
+            pending.append(activity_id)
+        else:
+            rows[activity_id] = cached
+    if len(pending) > 1 and max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            rows.update(zip(pending, pool.map(activity_best_efforts, pending, [root] * len(pending), chunksize=8)))
+    else:
+        rows.update((i, activity_best_efforts(i, root)) for i in pending)
+
+    columns = ["id"] + list(BEST_DISTANCES) + list(BEST_DURATIONS)
+    table = pd.DataFrame([{"id": i, **rows[i]} for i in ids], columns=columns)
+    return table.astype({col: "float64" for col in columns[1:]})
+
+
+def _rank(table: pd.DataFrame, k: int) -> Dict[str, pd.DataFrame]:
+    # 距離は所要時間の短い順、時間は距離の長い順に上位 k 件（id と値）
+    ranked = {col: table.nsmallest(k, col)[["id", col]] for col in BEST_DISTANCES}
+    ranked.update({col: table.nlargest(k, col)[["id", col]] for col in BEST_DURATIONS})
+    return ranked
+
+
+def best_effort_leaders(table: pd.DataFrame, activities: pd.DataFrame, k: int = 3) -> Dict[str, pd.DataFrame]:
+    """
+    全履歴での上位 k 件。距離は所要時間の短い順、時間は距離の長い順。
+    activities（id, name, start_date_local など）を結合して返す。
+    """
+    return {col: top.merge(activities, on="id", how="left") for col, top in _rank(table, k).items()}
+
+
+def best_effort_leaders_from_store(
+    k: int = 3, uri: str = DATA_STORE_URI, root: str = STREAM_STORE_DIR
+) -> Dict[str, pd.DataFrame]:
+    """
+    表示用の全履歴ベストエフォート（距離は所要時間、時間は距離 m を小数1桁で）。
+    ストリームストアから順位を出し、ストアからは上位候補の名前・日時だけを id で引く（全履歴は読まない）。
+    """
+    # 同じ値の順位は id の大きい（新しい）ものを先にする
+    ids = sorted(stream_ids(root), reverse=True)
+    if not ids:
+        return {}
+    table = best_efforts_table(ids, root)
+    if table.empty:
+        return {}
+    # ストリームストアは全アスリート共通なので、このストアに無い id は除く。
+    # 除いた分だけ k 件に足りなければ候補を広げて引き直す
+    n = k
+    while True:
+        ranked = _rank(table, n)
+        activities = load_ids(sorted({i for top in ranked.values() for i in top["id"].tolist()}), uri,
+                              ["id", "name", "start_date_local"])
+        known = activities["id"]
+        ranked = {col: top[top["id"].isin(known)].head(k) for col, top in ranked.items()}
+        if n >= len(table) or all(len(top) == k for top in ranked.values()):
+            break
+        n *= 4
+    if all(top.empty for top in ranked.values()):
+        return {}
+    leaders = {col: top.merge(activities, on="id", how="left").reset_index(drop=True) for col, top in ranked.items()}
+    for col, df in leaders.items():
+        leaders[col] = df.assign(**{
+            col: pd.to_timedelta(df[col], unit="s") if col in BEST_DISTANCES else df[col].round(1)
+        })
+    return leaders
+
+
+def stream_store_version(root: str = STREAM_STORE_DIR) -> str:
+    """ストリームストアの更新を表すトークン（アクティビティの追加・置き換えで変わる）"""
+    try:
+        st = os.stat(root)
+    except FileNotFoundError:
+        return "missing"
+    return f"{st.st_mtime_ns}:{st.st_nlink}"
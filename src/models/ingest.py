@@ -0,0 +1,132 @@
+"""
+取り込みパイプラインのストア側の段。
+
+各段はイテレータを受け取ってイテレータを返すジェネレータで、取得元
+（get_activity.iter_pages / convert.iter_json_records）とつないで使う。
+検証までは API の JSON（dict）のまま流し、そこから先は列指向の ActivityBatch（models/records.py）で流す。
+
+    write_batches(dedupe_batches(to_batches(validate_records(records))), uri)
+
+溜まるのは各段の上限（取得中のページ数・重複判定の窓・書き出しバッチ）だけなので、
+全履歴の取り込みでもメモリは一定。下流が止まれば上流も次を取りに行かない（背圧）。
+"""
+import math
+import sys
+from collections import Counter, deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+from config import DATA_STORE_URI
+from models.records import ActivityBatch
+from models.rollup import build_rollups, empty_rollups, merge_rollups, write_rollups
+from models.store import DATE_FORMAT, BatchWriter, add_date_keys
+from models.training_load import apply_activities, empty_state, write_training_state
+
+BATCH_SIZE = 5000  # まとめて書き出す行数
+# 重複判定に覚えておく直近の id 数。ページ取得中に新しいアクティビティが増えると
+# 前ページの末尾が次ページの先頭に再び現れるので、ページ幅の数倍あれば足りる
+DEDUPE_WINDOW = 1000
+
+_NUMERIC_FIELDS = ("distance", "moving_time", "elapsed_time", "total_elevation_gain", "utc_offset")
+
+
+def _invalid_reason(record: Dict[str, Any]) -> Optional[str]:
+    """取り込めないレコードなら理由を返す"""
+    if not isinstance(record.get("id"), int) or isinstance(record.get("id"), bool):
+        return "id"
+    for col in ("start_date", "start_date_local"):
+        value = record.get(col)
+        # ISO 8601（YYYY-MM-DDTHH:MM:SS...）であること。ストアの並びは文字列比較に頼っている
+        if not isinstance(value, str) or len(value) < 19 or value[10] != "T":
+            return col
+    for col in _NUMERIC_FIELDS:
+        value = record.get(col)
+        if value is not None and (not isinstance(value, (int, float)) or isinstance(value, bool) or math.isnan(value)):
+            return col
+    return None
+
+
+def validate_records(
+    records: Iterable[Dict[str, Any]], rejected: Optional[Counter] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    id・日時・数値項目の形が正しいレコードだけを通す。
+    捨てたものは rejected（項目名ごとの件数）に数え、標準エラーに id を出す。
+    """
+    for record in records:
+        reason = _invalid_reason(record)
+        if reason is None:
+            yield record
+            continue
+        if rejected is not None:
+            rejected[reason] += 1
+        print(f"不正なレコードを捨てました（{reason}）: id={record.get('id')!r}", file=sys.stderr)
+
+
+def dedupe_batches(
+    batches: Iterable[ActivityBatch], window: int = DEDUPE_WINDOW, duplicates: Optional[Counter] = None
+) -> Iterator[ActivityBatch]:
+    """直近 window 件の中で同じ id が再び来たら捨てる（最初のものを残す）"""
+    recent: deque = deque()
+    seen = set()
+    for batch in batches:
+        keep = np.ones(len(batch), dtype=bool)
+        for i, activity_id in enumerate(batch.ids.tolist()):
+            if activity_id in seen:
+                keep[i] = False
+                continue
+            seen.add(activity_id)
+            recent.append(activity_id)
+            if len(recent) > window:
+                seen.discard(recent.popleft())
+        dropped = len(batch) - int(keep.sum())
+        if duplicates is not None and dropped:
+            duplicates["duplicate"] += dropped
+        yield batch if not dropped else batch.take(keep)
+
+
+def iter_batches(records: Iterable[Dict[str, Any]], size: int = BATCH_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """レコードを size 件ずつのリストにまとめる"""
+    batch: List[Dict[str, Any]] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def to_batches(records: Iterable[Dict[str, Any]], size: int = BATCH_SIZE) -> Iterator[ActivityBatch]:
+    """dict のレコードを size 件ずつ列指向のバッチにする"""
+    for batch in iter_batches(records, size):
+        yield ActivityBatch.from_api(batch)
+
+
+def write_batches(batches: Iterable[ActivityBatch], uri: str = DATA_STORE_URI) -> Dict[str, Any]:
+    """
+    バッチをストアへ書き出し、ロールアップとトレーニング負荷も作り直す。
+    書き込みは一時ファイルに行い、完了後に置き換える（途中で失敗したら既存ストアは残る）。
+    戻り値は書き込み件数と最新アクティビティ（ハイウォーターマーク）。
+    """
+    newest: Dict[str, Any] = {}
+    newest_at = None
+    rollups = empty_rollups()
+    training = empty_state()
+    with BatchWriter(uri) as writer:
+        for batch in batches:
+            if not len(batch):
+                continue
+            # 日付キーはここで1回だけ計算し、ストア・ロールアップ・トレーニング負荷で共有する
+            batch_df = add_date_keys(batch.to_pandas())
+            writer.write_frame(batch_df)
+            # ロールアップは期間×種別の小さな表なのでバッチごとに足し込んでもメモリは増えない
+            rollups = merge_rollups(rollups, build_rollups(batch_df))
+            training = apply_activities(training, batch_df)
+            i = batch_df["start_date"].argmax()
+            if newest_at is None or batch_df["start_date"].iloc[i] > newest_at:
+                newest_at = batch_df["start_date"].iloc[i]
+                newest = {"start_date": newest_at.strftime(DATE_FORMAT), "id": int(batch_df["id"].iloc[i])}
+    write_rollups(rollups, uri)
+    write_training_state(training, uri)
+    return {"rows": writer.rows, "newest": newest}
@@ -0,0 +1,118 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import Dict, Iterable, Optional
+from config import DATA_STORE_URI
+from models.aggregate import frame_period_keys, period_keys, today_number
+from models.store import sidecar_path
+
+# ロールアップを持つ粒度（キーは models.aggregate の通し番号）
+ROLLUP_GRAINS = ("day", "week", "month")
+
+KEY_COLUMNS = ["grain", "period", "type"]
+SUM_COLUMNS = ["distance", "total_elevation_gain", "moving_time", "count", "hr_sum", "hr_count"]
+MAX_COLUMNS = ["hr_max"]
+ROLLUP_COLUMNS = KEY_COLUMNS + SUM_COLUMNS + MAX_COLUMNS
+
+
+def rollup_path(uri: str = DATA_STORE_URI) -> str:
+    """ストアごとのロールアップファイル（例: tmp_csv/activities.csv.rollups.csv）"""
+    return sidecar_path(uri, ".rollups.csv")
+
+
+def empty_rollups() -> pd.DataFrame:
+    return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+
+def build_rollups(df: pd.DataFrame, grains: Iterable[str] = ROLLUP_GRAINS) -> pd.DataFrame:
+    """アクティビティから (粒度, 期間, 種別) ごとの合計・件数・心拍の最大/合計を作る"""
+    if df.empty:
+        return empty_rollups()
+    hr = df["average_heartrate"].to_numpy(dtype="float64", na_value=np.nan)
+    base = pd.DataFrame({
+        "type": df["type"].astype(str).to_numpy(),
+        "distance": df["distance"].to_numpy(dtype="float64", na_value=0.0),
+        "total_elevation_gain": df["total_elevation_gain"].to_numpy(dtype="float64", na_value=0.0),
+        "moving_time": df["moving_time"].to_numpy(dtype="float64", na_value=0.0),
+        "count": 1,
+        # 平均心拍は合計と件数で持ち、マージ後に割って求める
+        "hr_sum": np.nan_to_num(hr),
+        "hr_count": (~np.isnan(hr)).astype(np.int64),
+        "hr_max": df["max_heartrate"].to_numpy(dtype="float64", na_value=np.nan),
+    })
+    frames = []
+    for grain in grains:
+        keyed = base.assign(grain=grain, period=frame_period_keys(df, grain))
+        frames.append(_reduce(keyed))
+    return pd.concat(frames, ignore_index=True)
+
+
+def _reduce(df: pd.DataFrame) -> pd.DataFrame:
+    agg = {col: "sum" for col in SUM_COLUMNS}
+    agg.update({col: "max" for col in MAX_COLUMNS})
+    return df.groupby(KEY_COLUMNS, as_index=False, sort=False).agg(agg)[ROLLUP_COLUMNS]
+
+
+def merge_rollups(existing: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """合計・件数は足し、最大値は max を取る（どちらも追加分だけで更新できる）"""
+    frames = [f for f in (existing, delta) if not f.empty]
+    if not frames:
+        return empty_rollups()
+    return _reduce(pd.concat(frames, ignore_index=True)).sort_values(KEY_COLUMNS, ignore_index=True)
+
+
+def read_rollups(uri: str = DATA_STORE_URI) -> pd.DataFrame:
+    path = rollup_path(uri)
+    if not os.path.exists(path):
+        return empty_rollups()
+    return pd.read_csv(path)
+
+
+def write_rollups(rollups: pd.DataFrame, uri: str = DATA_STORE_URI) -> None:
+    path = rollup_path(uri)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    rollups.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+def update_rollups(
+    added: pd.DataFrame, uri: str = DATA_STORE_URI, history: Optional[pd.DataFrame] = None
+) -> pd.DataFrame:
+    """
+    新しく追加されたアクティビティの分だけロールアップを更新して保存する。
+    ファイルがまだ無ければ history（追加分を含む全履歴）から一度だけ作る（追加分だけの集計にならないように）。
+    """
+    if history is not None and not os.path.exists(rollup_path(uri)):
+        rollups = build_rollups(history)
+        write_rollups(rollups, uri)
+        return rollups
+    rollups = merge_rollups(read_rollups(uri), build_rollups(added))
+    write_rollups(rollups, uri)
+    return rollups
+
+
+def rollup_series(rollups: pd.DataFrame, grain: str, by_type: bool = False) -> pd.DataFrame:
+    """
+    トレンドチャート向けに粒度ごとの時系列を返す（index は期間キー）。
+    hr_mean は期間内の平均心拍の平均。
+    """
+    df = rollups[rollups["grain"] == grain]
+    keys = ["period", "type"] if by_type else ["period"]
+    agg = {col: "sum" for col in SUM_COLUMNS}
+    agg.update({col: "max" for col in MAX_COLUMNS})
+    out = df.groupby(keys).agg(agg)
+    out["hr_mean"] = out["hr_sum"] / out["hr_count"].where(out["hr_count"] > 0)
+    return out
+
+
+def current_totals(
+    rollups: pd.DataFrame, now: Optional[pd.Timestamp] = None, grains: Iterable[str] = ("month", "week")
+) -> Dict[str, Dict[str, float]]:
+    """now を含む期間（今月・今週など）の合計をロールアップから引く"""
+    today = today_number(now)
+    totals: Dict[str, Dict[str, float]] = {}
+    for grain in grains:
+        hit = rollups[(rollups["grain"] == grain) & (rollups["period"] == period_keys(today, grain)[0])]
+        totals[grain] = {col: float(hit[col].sum()) for col in ("distance", "total_elevation_gain")}
+    return totals
@@ -0,0 +1,223 @@
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+import pandas as pd
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+TABLE = "activities"
+
+# SQLite 上の列定義（日時は API と同じ ISO 8601 文字列なので文字列順＝時系列順）
+SQL_COLUMNS = {
+    "id": "INTEGER PRIMARY KEY",
+    "name": "TEXT",
+    "distance": "REAL",
+    "moving_time": "INTEGER",
+    "elapsed_time": "INTEGER",
+    "total_elevation_gain": "REAL",
+    "type": "TEXT",
+    "start_date": "TEXT",
+    "start_date_local": "TEXT",
+    "timezone": "TEXT",
+    "utc_offset": "REAL",
+    "average_speed": "REAL",
+    "max_speed": "REAL",
+    "average_cadence": "REAL",
+    "average_temp": "REAL",
+    "average_heartrate": "REAL",
+    "max_heartrate": "REAL",
+    # 取り込み時に計算する日付キー（models.store.DATE_KEY_COLUMNS）
+    "start_epoch": "INTEGER",
+    "local_day": "INTEGER",
+    "local_week": "INTEGER",
+    "local_month": "INTEGER",
+}
+
+DATE_KEY_SQL_COLUMNS = ("start_epoch", "local_day", "local_week", "local_month")
+
+# 日付キーを持たない古いテーブルを埋める式（models.store.add_date_keys と同じ計算）
+_LOCAL_SECONDS = (
+    "COALESCE(CAST(strftime('%s', start_date) AS INTEGER) + CAST(utc_offset AS INTEGER), "
+    "CAST(strftime('%s', start_date_local) AS INTEGER))"
+)
+_DATE_KEY_BACKFILL = {
+    "start_epoch": "CAST(strftime('%s', start_date) AS INTEGER)",
+    # 負の値でも切り捨てになるように剰余で割り切れる値にしてから割る
+    "local_day": f"({_LOCAL_SECONDS} - ((({_LOCAL_SECONDS}) % 86400) + 86400) % 86400) / 86400",
+    "local_month": (
+        f"(CAST(strftime('%Y', {_LOCAL_SECONDS}, 'unixepoch') AS INTEGER) - 1970) * 12 "
+        f"+ CAST(strftime('%m', {_LOCAL_SECONDS}, 'unixepoch') AS INTEGER) - 1"
+    ),
+}
+
+INDEXES = {
+    "idx_activities_start_date_local": "start_date_local",
+    "idx_activities_type": "type",
+    "idx_activities_local_day": "local_day",
+}
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """テーブルとインデックスを用意した接続を返す"""
+    conn = sqlite3.connect(path)
+    cols = ", ".join(f"{name} {sql_type}" for name, sql_type in SQL_COLUMNS.items())
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {TABLE} ({cols})")
+    _add_date_keys(conn)
+    for index, col in INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {TABLE} ({col})")
+    return conn
+
+
+def connect_readonly(path: str) -> sqlite3.Connection:
+    """
+    読み込み用の接続。DDL は実行せず、ファイルが無ければ作らずに失敗する（呼び出し側で存在を確認する）。
+    日付キーの無い古いテーブルだけは、一度 connect で列を足してから開き直す。
+    """
+    uri = f"{Path(path).resolve().as_uri()}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True)
+    if not _missing_columns(conn):
+        return conn
+    conn.close()
+    connect(path).close()
+    return sqlite3.connect(uri, uri=True)
+
+
+def _missing_columns(conn: sqlite3.Connection) -> List[str]:
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({TABLE})")}
+    return [col for col in SQL_COLUMNS if col not in existing]
+
+
+def _add_date_keys(conn: sqlite3.Connection) -> None:
+    """日付キーの列が無い古いテーブルに列を足して埋める（最初に開いたときの1回だけ）"""
+    missing = _missing_columns(conn)
+    if not missing:
+        return
+    for col in missing:
+        conn.execute(f"ALTER TABLE {TABLE} ADD COLUMN {col} {SQL_COLUMNS[col]}")
+    conn.execute(
+        f"UPDATE {TABLE} SET start_epoch = {_DATE_KEY_BACKFILL['start_epoch']}, "
+        f"local_day = {_DATE_KEY_BACKFILL['local_day']}, local_month = {_DATE_KEY_BACKFILL['local_month']}"
+    )
+    # 1970-01-01 は木曜日なので +3 で月曜始まりの週番号になる（models.aggregate.period_keys と同じ）
+    conn.execute(f"UPDATE {TABLE} SET local_week = (local_day + 3 - (((local_day + 3) % 7) + 7) % 7) / 7")
+    conn.commit()
+
+
+def upsert_records(conn: sqlite3.Connection, records: Iterable[Dict[str, Any]]) -> None:
+    """id をキーに行を追加・上書きする（同じ id は後勝ち）"""
+    cols = list(SQL_COLUMNS)
+    placeholders = ", ".join("?" for _ in cols)
+    conn.executemany(
+        f"INSERT OR REPLACE INTO {TABLE} ({', '.join(cols)}) VALUES ({placeholders})",
+        ([record.get(c) for c in cols] for record in records),
+    )
+
+
+def existing_ids(conn: sqlite3.Connection, ids: Sequence[int], chunk: int = 500) -> List[int]:
+    """ids のうち既にテーブルにあるもの"""
+    found: List[int] = []
+    for i in range(0, len(ids), chunk):
+        part = list(ids[i:i + chunk])
+        placeholders = ", ".join("?" for _ in part)
+        rows = conn.execute(f"SELECT id FROM {TABLE} WHERE id IN ({placeholders})", part).fetchall()
+        found.extend(r[0] for r in rows)
+    return found
+
+
+def _select(columns: Optional[Sequence[str]]) -> str:
+    # 指定が無ければアクティビティの列だけ（日付キーは求められたときだけ返す）
+    if columns is None:
+        columns = [col for col in SQL_COLUMNS if col not in DATE_KEY_SQL_COLUMNS]
+    return ", ".join(columns)
+
+
+def query(path: str, sql: str, params: Sequence[Any] = ()) -> pd.DataFrame:
+    """SQL の結果を DataFrame で返す（型変換は呼び出し側で行う）"""
+    with closing(connect_readonly(path)) as conn:
+        return pd.read_sql_query(sql, conn, params=list(params))
+
+
+def select_all(path: str, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    return query(path, f"SELECT {_select(columns)} FROM {TABLE} ORDER BY start_date_local DESC")
+
+
+def select_latest(path: str, n: int, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """インデックスを使って新しい順に n 件だけ読む"""
+    return query(path, f"SELECT {_select(columns)} FROM {TABLE} ORDER BY start_date_local DESC LIMIT ?", [n])
+
+
+def select_page(path: str, offset: int, limit: int, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """新しい順で offset 件目から limit 件（インデックス順に読むので並べ替えは不要）"""
+    return query(
+        path,
+        f"SELECT {_select(columns)} FROM {TABLE} ORDER BY start_date_local DESC LIMIT ? OFFSET ?",
+        [limit, offset],
+    )
+
+
+def count_rows(path: str) -> int:
+    with closing(connect_readonly(path)) as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM {TABLE}").fetchone()[0]
+
+
+def select_window(path: str, start_day: int, end_day: int, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """start_day <= local_day < end_day の範囲をインデックスで読む"""
+    return query(
+        path,
+        f"SELECT {_select(columns)} FROM {TABLE} "
+        "WHERE local_day >= ? AND local_day < ? ORDER BY start_date_local DESC",
+        [start_day, end_day],
+    )
+
+
+def select_ids(path: str, ids: Sequence[int], columns: Optional[Sequence[str]] = None, chunk: int = 500) -> pd.DataFrame:
+    """id を指定して読む（主キーで引くので件数に比例）"""
+    frames = []
+    for i in range(0, len(ids), chunk):
+        part = list(ids[i:i + chunk])
+        placeholders = ", ".join("?" for _ in part)
+        frames.append(query(path, f"SELECT {_select(columns)} FROM {TABLE} WHERE id IN ({placeholders})", part))
+    return pd.concat(frames, ignore_index=True)
+
+
+def select_top_by(path: str, col: str, k: int, within_latest: Optional[int] = None) -> pd.DataFrame:
+    """col の上位 k 件（within_latest 指定時は直近 n 件の中から）。NULL は除外する"""
+    if col not in SQL_COLUMNS:
+        raise ValueError(f"未知の列です: {col}")
+    source = TABLE
+    params: List[Any] = []
+    if within_latest is not None:
+        source = f"(SELECT * FROM {TABLE} ORDER BY start_date_local DESC LIMIT ?)"
+        params.append(within_latest)
+    # SQLite は負の LIMIT を無制限として扱うので 0 で止める
+    params.append(max(k, 0))
+    return query(
+        path,
+        # 同値は新しいものを先にする（models.activities.top_k_by と同じ並び）
+        f"SELECT {_select(None)} FROM {source} WHERE {col} IS NOT NULL "
+        f"ORDER BY {col} DESC, start_date_local DESC LIMIT ?",
+        params,
+    )
+
+
+def select_period_totals(path: str, periods: Dict[str, Sequence[int]], latest_n: int) -> pd.DataFrame:
+    """
+    期間ごとの総距離 (m) と総獲得標高を1回の範囲スキャンで集計する。
+    periods は {ラベル: (start_day, end_day)}（local_day の範囲）。latest_n 件の合計も同じ結果に含める。
+    """
+    cases = []
+    params: List[Any] = []
+    for label, (start, end) in periods.items():
+        cond = "local_day >= ? AND local_day < ?"
+        cases.append(
+            f"SELECT ? AS label, "
+            f"COALESCE(SUM(CASE WHEN {cond} THEN distance END), 0) AS distance, "
+            f"COALESCE(SUM(CASE WHEN {cond} THEN total_elevation_gain END), 0) AS total_elevation_gain "
+            f"FROM {TABLE} WHERE local_day >= ?"
+        )
+        params.extend([label, start, end, start, end, start])
+    cases.append(
+        "SELECT 'latest' AS label, COALESCE(SUM(distance), 0), COALESCE(SUM(total_elevation_gain), 0) "
+        f"FROM (SELECT distance, total_elevation_gain FROM {TABLE} ORDER BY start_date_local DESC LIMIT ?)"
+    )
+    params.append(latest_n)
+    return query(path, " UNION ALL ".join(cases), params)
@@ -0,0 +1,627 @@
+import bisect
+import csv
+import json
+import os
+from contextlib import closing
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from config import DATA_STORE_URI
+from models import sqlite_store
+from models.aggregate import period_keys
+
+# get_activity.py が出力するフィールド（CSV の列順）
+ACTIVITY_COLUMNS = [
+    "id",
+    "name",
+    "distance",
+    "moving_time",
+    "elapsed_time",
+    "total_elevation_gain",
+    "type",
+    "start_date",
+    "start_date_local",
+    "timezone",
+    "utc_offset",
+    "average_speed",
+    "max_speed",
+    "average_cadence",
+    "average_temp",
+    "average_heartrate",
+    "max_heartrate",
+]
+
+# 列ごとの型（日時は DATETIME_COLUMNS で別途パースする）
+ACTIVITY_DTYPES = {
+    "id": "int64",
+    "name": "string",
+    "distance": "float64",
+    "moving_time": "Int64",
+    "elapsed_time": "Int64",
+    "total_elevation_gain": "float64",
+    "type": "category",
+    "timezone": "category",
+    "utc_offset": "float64",
+    "average_speed": "float64",
+    "max_speed": "float64",
+    "average_cadence": "Float64",
+    "average_temp": "Float64",
+    "average_heartrate": "Float64",
+    "max_heartrate": "Float64",
+}
+DATETIME_COLUMNS = ["start_date", "start_date_local"]
+
+# 取り込み時に計算して保存する日付キー。start_epoch は UTC のエポック秒、
+# local_* は start_epoch + utc_offset の現地日付から作る期間キー（models.aggregate.period_keys と同じ通し番号）。
+# 期間の絞り込み・集計は日時を解釈し直さずにこの整数で比較する
+DATE_KEY_COLUMNS = ["start_epoch", "local_day", "local_week", "local_month"]
+DATE_KEY_DTYPES = {"start_epoch": "int64", "local_day": "int32", "local_week": "int32", "local_month": "int32"}
+# 日付キーの計算に使う列
+DATE_KEY_SOURCES = ["start_date", "start_date_local", "utc_offset"]
+STORE_COLUMNS = ACTIVITY_COLUMNS + DATE_KEY_COLUMNS
+
+# CSV / 同期状態に書く日時の形式（Strava API と同じ）
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# ストアは常にこの列の降順（新しい順）で保存する
+SORT_COLUMN = "start_date_local"
+
+# 拡張子からのバックエンド推定
+_BACKEND_BY_EXT = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".db": "sqlite",
+    ".sqlite": "sqlite",
+}
+
+
+def parse_store_uri(uri: str = DATA_STORE_URI) -> Tuple[str, str]:
+    """
+    ストア URI を (backend, path) に分解する。
+    "arrow://tmp_csv/activities.arrow" のようにスキームで指定するか、
+    スキーム無しのパスなら拡張子から判定する。
+    """
+    if "://" in uri:
+        backend, path = uri.split("://", 1)
+    else:
+        backend = _BACKEND_BY_EXT.get(os.path.splitext(uri)[1].lower(), "csv")
+        path = uri
+    if backend not in set(_BACKEND_BY_EXT.values()):
+        raise ValueError(f"未対応のストアです: {uri}")
+    return backend, path
+
+
+def normalize_types(df: pd.DataFrame) -> pd.DataFrame:
+    """文字列や object 列をストアの型（日時・カテゴリ・nullable float）にそろえる"""
+    df = df.copy()
+    for col in DATETIME_COLUMNS:
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], utc=True, format="ISO8601")
+    for col, dtype in {**ACTIVITY_DTYPES, **DATE_KEY_DTYPES}.items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def add_date_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    日付キー（DATE_KEY_COLUMNS）を1回のベクトル演算で計算して足す。
+    start_date_local は現地時刻なのに "Z" 付きで返ってくるので、現地日付は UTC の start_date に
+    アクティビティごとの utc_offset を足して求める（utc_offset が無い行だけ start_date_local の壁時計を使う）。
+    """
+    epoch = df["start_date"].to_numpy(dtype="datetime64[s]").astype(np.int64)
+    wall = df["start_date_local"].to_numpy(dtype="datetime64[s]").astype(np.int64)
+    offset = df["utc_offset"].to_numpy(dtype="float64", na_value=np.nan)
+    local = np.where(np.isnan(offset), wall, epoch + np.nan_to_num(offset).astype(np.int64))
+    day = local // 86400
+    return df.assign(
+        start_epoch=epoch,
+        local_day=day.astype(np.int32),
+        local_week=period_keys(day, "week").astype(np.int32),
+        local_month=period_keys(day, "month").astype(np.int32),
+    )
+
+
+def _stored_columns(backend: str, path: str) -> List[str]:
+    if backend == "arrow":
+        return _open_arrow(path).column_names
+    if backend == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path).names
+    if backend == "sqlite":
+        # 開くときに（connect / connect_readonly）足りない列を追加して埋めるので常にそろっている
+        return list(sqlite_store.SQL_COLUMNS)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _read_plan(columns: Optional[Sequence[str]], backend: str, path: str) -> Tuple[List[str], List[str], bool]:
+    """
+    (返す列, 実際に読む列, 読んだ後に日付キーを計算するか)。列の指定が無ければ ACTIVITY_COLUMNS を返す。
+    日付キーを持たない古いストアでキーを求められたときだけ、元の列を読んで計算する。
+    """
+    wanted = list(columns) if columns is not None else list(ACTIVITY_COLUMNS)
+    keys = [c for c in wanted if c in DATE_KEY_COLUMNS]
+    if not keys or set(keys) <= set(_stored_columns(backend, path)):
+        return wanted, wanted, False
+    read = list(dict.fromkeys([c for c in wanted if c not in DATE_KEY_COLUMNS] + DATE_KEY_SOURCES))
+    return wanted, read, True
+
+
+def _finish(df: pd.DataFrame, wanted: List[str], derive: bool) -> pd.DataFrame:
+    return add_date_keys(df)[wanted] if derive else df
+
+
+def _empty_store(columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    return normalize_types(pd.DataFrame(columns=list(columns or ACTIVITY_COLUMNS)))
+
+
+def read_store(uri: str = DATA_STORE_URI, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """
+    保存済みのアクティビティを型付きで読み込む（未作成なら空の DataFrame）。
+    columns を渡すとその列だけを読む。
+    """
+    backend, path = parse_store_uri(uri)
+    if not os.path.exists(path):
+        return _empty_store(columns)
+    wanted, columns, derive = _read_plan(columns, backend, path)
+    if backend == "arrow":
+        df = _arrow_to_pandas(_open_arrow(path, columns))
+    elif backend == "sqlite":
+        df = normalize_types(sqlite_store.select_all(path, columns))
+    elif backend == "parquet":
+        # 型はファイルに保存されているので日時の再パースは不要
+        df = pd.read_parquet(path, columns=columns)
+    else:
+        df = normalize_types(pd.read_csv(path, usecols=columns)[columns])
+    return _finish(df, wanted, derive)
+
+
+def _open_arrow(path: str, columns: Optional[Sequence[str]] = None):
+    """
+    Arrow IPC ファイルをメモリマップで開く（pyarrow.Table）。
+    非圧縮で書いているので読み込みはゼロコピーで、実際に触った範囲だけがページインされる。
+    """
+    import pyarrow as pa
+
+    table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+    return table.select(list(columns)) if columns is not None else table
+
+
+def _arrow_table(df: pd.DataFrame):
+    """
+    DataFrame を Arrow IPC 用のテーブルにする。
+    IPC ファイルはバッチ間で辞書を差し替えられないため、カテゴリ列は文字列で持つ。
+    """
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+    return table.replace_schema_metadata(None)
+
+
+def _arrow_to_pandas(table) -> pd.DataFrame:
+    """切り出した範囲だけを DataFrame にし、カテゴリ・nullable 型を戻す"""
+    df = table.to_pandas()
+    for col, dtype in {**ACTIVITY_DTYPES, **DATE_KEY_DTYPES}.items():
+        if col in df.columns:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def load_latest(n: int, uri: str = DATA_STORE_URI, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """新しい順に並んだストアの先頭 n 件だけを読み込む"""
+    backend, path = parse_store_uri(uri)
+    if not os.path.exists(path):
+        return _empty_store(columns)
+    wanted, columns, derive = _read_plan(columns, backend, path)
+    return _finish(_load_latest(n, backend, path, columns), wanted, derive)
+
+
+def _load_latest(n: int, backend: str, path: str, columns: List[str]) -> pd.DataFrame:
+    if backend == "arrow":
+        return _arrow_to_pandas(_open_arrow(path, columns).slice(0, n))
+    if backend == "sqlite":
+        return normalize_types(sqlite_store.select_latest(path, n, columns))
+    if backend == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # 先頭の行グループから n 件に達するまでだけ読む
+        pf = pq.ParquetFile(path)
+        batches, rows = [], 0
+        for batch in pf.iter_batches(batch_size=n, columns=columns):
+            batches.append(batch)
+            rows += batch.num_rows
+            if rows >= n:
+                break
+        if not batches:
+            return _empty_store(columns)
+        return pa.Table.from_batches(batches).slice(0, n).to_pandas()
+    # CSV は手作業で置かれたファイルもあり得るので並びを確認してから切り出す
+    df = read_store(f"csv://{path}", columns)
+    if SORT_COLUMN in df.columns and not df[SORT_COLUMN].is_monotonic_decreasing:
+        df = df.sort_values(SORT_COLUMN, ascending=False)
+    return df.head(n).reset_index(drop=True)
+
+
+def load_page(
+    offset: int, limit: int, uri: str = DATA_STORE_URI, columns: Optional[Sequence[str]] = None
+) -> pd.DataFrame:
+    """新しい順に並んだストアの offset 件目から limit 件だけを読み込む（表のページ送り用）"""
+    backend, path = parse_store_uri(uri)
+    if not os.path.exists(path):
+        return _empty_store(columns)
+    wanted, columns, derive = _read_plan(columns, backend, path)
+    return _finish(_load_page(offset, limit, backend, path, columns), wanted, derive)
+
+
+def _load_page(offset: int, limit: int, backend: str, path: str, columns: List[str]) -> pd.DataFrame:
+    if backend == "arrow":
+        return _arrow_to_pandas(_open_arrow(path, columns).slice(offset, limit))
+    if backend == "sqlite":
+        return normalize_types(sqlite_store.select_page(path, offset, limit, columns))
+    if backend == "parquet":
+        import pyarrow.parquet as pq
+
+        # ページに掛かる行グループだけを読む
+        pf = pq.ParquetFile(path)
+        groups, first, start = [], None, 0
+        for i in range(pf.num_row_groups):
+            rows = pf.metadata.row_group(i).num_rows
+            if start + rows > offset and start < offset + limit:
+                groups.append(i)
+                first = start if first is None else first
+            start += rows
+        if not groups:
+            return _empty_store(columns)
+        table = pf.read_row_groups(groups, columns=columns)
+        return table.slice(offset - first, limit).to_pandas()
+    # CSV は write_store / BatchWriter が新しい順で書いているので、その並びのまま行を飛ばして読む
+    return normalize_types(pd.read_csv(path, usecols=columns, skiprows=range(1, offset + 1), nrows=limit)[columns])
+
+
+def count_rows(uri: str = DATA_STORE_URI) -> int:
+    """ストアの件数（行は読まずにメタデータや行数だけで数える）"""
+    backend, path = parse_store_uri(uri)
+    if not os.path.exists(path):
+        return 0
+    if backend == "arrow":
+        return _open_arrow(path).num_rows
+    if backend == "sqlite":
+        return sqlite_store.count_rows(path)
+    if backend == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).metadata.num_rows
+    with open(path, "rb") as f:
+        lines = sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b""))
+    # ヘッダ行を除く
+    return max(lines - 1, 0)
+
+
+def load_ids(ids: Sequence[int], uri: str = DATA_STORE_URI, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+    """指定した id の行だけを読み込む（表示用に少数の id を引く。並びは問わない）"""
+    backend, path = parse_store_uri(uri)
+    ids = [int(i) for i in ids]
+    if not ids or not os.path.exists(path):
+        return _empty_store(columns)
+    wanted, columns, derive = _read_plan(columns, backend, path)
+    columns = list(dict.fromkeys([*columns, "id"]))
+    if backend == "sqlite":
+        df = normalize_types(sqlite_store.select_ids(path, ids, columns))
+    elif backend == "arrow":
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        table = _open_arrow(path, columns)
+        df = _arrow_to_pandas(table.filter(pc.is_in(table.column("id"), value_set=pa.array(ids, pa.int64()))))
+    elif backend == "parquet":
+        df = pd.read_parquet(path, columns=columns, filters=[("id", "in", ids)])
+    else:
+        df = read_store(f"csv://{path}", columns)
+        df = df[df["id"].isin(ids)]
+    return _finish(df.reset_index(drop=True), wanted, derive)[wanted]
+
+
+def local_day_number(ts: pd.Timestamp) -> int:
+    """日時（start_date_local と同じく現地の壁時計）の日付を local_day と同じ日数にする"""
+    ts = pd.Timestamp(ts)
+    wall = ts.tz_localize(None) if ts.tzinfo is not None else ts
+    return int(wall.to_datetime64().astype("datetime64[D]").astype(np.int64))
+
+
+def _negate(value: Any) -> int:
+    return -int(value)
+
+
+def _first_below(days, value: int) -> int:
+    """
+    降順（新しい順）の local_day 列（pyarrow.ChunkedArray）で value 未満になる最初の行。
+    BatchWriter はバッチごとにチャンクを書くので、列を連結せず、境界を含むチャンクだけを二分探索する。
+    """
+    offset = 0
+    for chunk in days.chunks:
+        # メモリマップ上のバッファをそのまま numpy で見る（コピーしない）
+        values = chunk.to_numpy()
+        if len(values) and values[-1] < value:
+            # 符号を反転したキーは昇順なので bisect がそのまま使える（触るのは log n 要素だけ）
+            return offset + bisect.bisect_right(values, -value, key=_negate)
+        offset += len(values)
+    return offset
+
+
+def load_window(
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    uri: str = DATA_STORE_URI,
+    columns: Optional[Sequence[str]] = None,
+) -> pd.DataFrame:
+    """
+    start <= start_date_local < end の行だけを読み込む（新しい順）。
+    範囲は現地日付の単位で、日付キー local_day の整数比較で絞る（時刻は切り捨てる）。
+    """
+    backend, path = parse_store_uri(uri)
+    lo, hi = local_day_number(start), local_day_number(end)
+    if not os.path.exists(path):
+        return _empty_store(columns)
+    if backend == "sqlite":
+        return normalize_types(sqlite_store.select_window(path, lo, hi, columns=columns))
+    wanted = list(columns) if columns is not None else list(ACTIVITY_COLUMNS)
+    if backend == "arrow":
+        table = _open_arrow(path)
+        if "local_day" in table.column_names:
+            days = table.column("local_day")
+            first, last = _first_below(days, hi), _first_below(days, lo)
+            return _arrow_to_pandas(table.slice(first, last - first).select(wanted))
+    if backend == "parquet":
+        # 行グループの統計で範囲外を読み飛ばす（ストアは新しい順なので行グループごとに日付がまとまっている）
+        read_cols, _, derive = _read_plan(list(dict.fromkeys([*wanted, "local_day"])), backend, path)
+        if not derive:
+            df = pd.read_parquet(path, columns=read_cols, filters=[("local_day", ">=", lo), ("local_day", "<", hi)])
+            return normalize_types(df.reset_index(drop=True))[wanted]
+    df = read_store(uri, list(dict.fromkeys([*wanted, SORT_COLUMN, "local_day"])))
+    days = df["local_day"].to_numpy()
+    df = df[(days >= lo) & (days < hi)].sort_values(SORT_COLUMN, ascending=False).reset_index(drop=True)
+    return df[wanted]
+
+
+def write_store(df: pd.DataFrame, uri: str = DATA_STORE_URI) -> None:
+    """アクティビティを新しい順に並べて保存する"""
+    backend, path = parse_store_uri(uri)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    df = add_date_keys(normalize_types(df[ACTIVITY_COLUMNS])).sort_values(SORT_COLUMN, ascending=False)
+    tmp_path = path + ".tmp"
+    if backend == "arrow":
+        import pyarrow as pa
+
+        table = _arrow_table(df)
+        with pa.ipc.new_file(tmp_path, table.schema) as writer:
+            writer.write_table(table)
+    elif backend == "sqlite":
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        with closing(sqlite_store.connect(tmp_path)) as conn:
+            sqlite_store.upsert_records(conn, to_records(df))
+            conn.commit()
+    elif backend == "parquet":
+        df.to_parquet(tmp_path, index=False)
+    else:
+        df.to_csv(tmp_path, index=False, date_format=DATE_FORMAT)
+    os.replace(tmp_path, path)
+
+
+def sidecar_path(uri: str, suffix: str) -> str:
+    """
+    ストアに付随するファイル（ロールアップ・同期状態など）のパス。拡張子を含むストアのパス全体に suffix を付けるので、
+    バックエンドを切り替えても別のファイルになる（例: tmp_csv/activities.parquet.rollups.csv）。
+    """
+    _, path = parse_store_uri(uri)
+    return path + suffix
+
+
+def sync_state_path(uri: str = DATA_STORE_URI) -> str:
+    return sidecar_path(uri, ".sync_state.json")
+
+
+def store_version(uri: str = DATA_STORE_URI) -> str:
+    """
+    ストア（とロールアップ・トレーニング負荷の状態）の更新を表すトークン。ファイルの mtime とサイズから作るので
+    同期で書き換わると変わり、変わっていなければ stat だけで判定できる。
+    """
+    # rollup / training_load は store を import しているのでここで読み込む
+    from models.rollup import rollup_path
+    from models.training_load import training_state_path
+
+    _, path = parse_store_uri(uri)
+    parts = []
+    for p in (path, rollup_path(uri), training_state_path(uri), path + "-wal"):
+        if os.path.exists(p):
+            st = os.stat(p)
+            parts.append(f"{st.st_mtime_ns}:{st.st_size}")
+        else:
+            parts.append("-")
+    return "/".join(parts)
+
+
+def to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """DataFrame を API と同じ形（ISO 8601 文字列・欠損は None）の dict に戻す"""
+    out = df.copy()
+    for col in DATETIME_COLUMNS:
+        if col in out.columns:
+            out[col] = out[col].dt.strftime(DATE_FORMAT)
+    out = out.astype(object).where(out.notna(), None)
+    return out.to_dict("records")
+
+
+def merge_activities(
+    rows: List[Dict[str, Any]], uri: str = DATA_STORE_URI
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    新しく取得した行を既存ストアへマージする。
+    同じ id は新しく取得した方で上書きする（名前の変更などを反映するため）。
+    戻り値は (マージ後の全体, 今回初めて追加された行)。
+    """
+    backend, path = parse_store_uri(uri)
+    incoming = normalize_types(pd.DataFrame(rows, columns=ACTIVITY_COLUMNS))
+    incoming = incoming.drop_duplicates(subset="id", keep="last")
+    if backend == "sqlite":
+        # 主キー（id）で upsert するので既存行をメモリに読み込む必要はない
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(sqlite_store.connect(path)) as conn:
+            known = sqlite_store.existing_ids(conn, incoming["id"].tolist())
+            sqlite_store.upsert_records(conn, to_records(add_date_keys(incoming)))
+            conn.commit()
+        return read_store(uri), incoming[~incoming["id"].isin(known)]
+
+    existing = read_store(uri)
+    added = incoming[~incoming["id"].isin(existing["id"])]
+    frames = [f for f in (existing, incoming) if not f.empty]
+    if not frames:
+        return existing, added
+    merged = pd.concat(frames, ignore_index=True)
+    merged = merged.drop_duplicates(subset="id", keep="last")
+    write_store(merged, uri)
+    return merged, added
+
+
+class BatchWriter:
+    """
+    レコード（dict）または DataFrame をバッチ単位でストアへ追記する。
+    一時ファイルに書き、close() で元のファイルと置き換える。
+    入力が新しい順でなかった場合だけ、close() 時に一度並べ替えて書き直す。
+    """
+
+    def __init__(self, uri: str = DATA_STORE_URI):
+        self.backend, self.path = parse_store_uri(uri)
+        self.tmp_path = self.path + ".partial"
+        self.rows = 0
+        self.sorted = True
+        self._last_key: Optional[pd.Timestamp] = None
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = None
+        self._writer = None
+        self._schema = None
+        self._conn = None
+        if self.backend == "csv":
+            self._file = open(self.tmp_path, mode="w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(STORE_COLUMNS)
+        elif self.backend == "sqlite":
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+            self._conn = sqlite_store.connect(self.tmp_path)
+
+    def write(self, records: List[Dict[str, Any]]) -> None:
+        self.write_frame(normalize_types(pd.DataFrame(records, columns=ACTIVITY_COLUMNS)))
+
+    def write_frame(self, df: pd.DataFrame) -> None:
+        """ストアの型にそろえた DataFrame（ActivityBatch.to_pandas など）を追記する（日付キーはここで計算する）"""
+        self._track_order(df[SORT_COLUMN])
+        df = df[STORE_COLUMNS] if set(DATE_KEY_COLUMNS) <= set(df.columns) else add_date_keys(df[ACTIVITY_COLUMNS])
+        if self.backend == "csv":
+            df.to_csv(self._file, header=False, index=False, date_format=DATE_FORMAT)
+        elif self.backend == "sqlite":
+            sqlite_store.upsert_records(self._conn, to_records(df))
+            self._conn.commit()
+        else:
+            import pyarrow as pa
+
+            if self.backend == "arrow":
+                table = _arrow_table(df)
+            else:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                self._writer = self._open_writer(table.schema)
+            # カテゴリの辞書はバッチごとに異なるので先頭バッチのスキーマに合わせる
+            self._writer.write_table(table.cast(self._schema))
+        self.rows += len(df)
+
+    def _open_writer(self, schema):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.backend == "arrow":
+            return pa.ipc.new_file(self.tmp_path, schema)
+        return pq.ParquetWriter(self.tmp_path, schema)
+
+    def _track_order(self, keys: pd.Series) -> None:
+        if not len(keys):
+            return
+        if self.sorted and (
+            not keys.is_monotonic_decreasing or (self._last_key is not None and keys.iloc[0] > self._last_key)
+        ):
+            self.sorted = False
+        self._last_key = keys.iloc[-1]
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        elif self._conn is not None:
+            self._conn.close()
+        elif self._writer is not None:
+            self._writer.close()
+        else:
+            write_store(_empty_store(), f"{self.backend}://{self.tmp_path}")
+        # SQLite はインデックスで並びを保証するので並べ替え不要
+        if self.sorted or self.backend == "sqlite":
+            os.replace(self.tmp_path, self.path)
+        else:
+            write_store(read_store(f"{self.backend}://{self.tmp_path}"), f"{self.backend}://{self.path}")
+            os.remove(self.tmp_path)
+
+    def __enter__(self) -> "BatchWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # 失敗時は既存ストアを残して一時ファイルだけ捨てる
+            if self._file is not None:
+                self._file.close()
+            elif self._conn is not None:
+                self._conn.close()
+            elif self._writer is not None:
+                self._writer.close()
+            if os.path.exists(self.tmp_path):
+                os.remove(self.tmp_path)
+
+
+def load_sync_state(path: Optional[str] = None) -> Dict[str, Any]:
+    """前回同期時点のハイウォーターマーク（最新の start_date と id）を読み込む（既定は DATA_STORE_URI の状態ファイル）"""
+    path = path or sync_state_path()
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_sync_state(state: Dict[str, Any], path: Optional[str] = None) -> Dict[str, Any]:
+    """ハイウォーターマークを JSON に保存する"""
+    path = path or sync_state_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(state, f, indent=2)
+    return state
+
+
+def save_sync_state(df: pd.DataFrame, path: Optional[str] = None) -> Dict[str, Any]:
+    """ストア内で最も新しいアクティビティをハイウォーターマークとして保存する"""
+    if df.empty:
+        return {}
+    newest = df.sort_values("start_date", ascending=False).iloc[0]
+    state = {"start_date": newest["start_date"].strftime(DATE_FORMAT), "id": int(newest["id"])}
+    return write_sync_state(state, path)
+
+
+def after_epoch(state: Dict[str, Any]) -> Optional[int]:
+    """ハイウォーターマークを API の after パラメータ（UNIX 秒）に変換する"""
+    if not state.get("start_date"):
+        return None
+    return int(datetime.fromisoformat(state["start_date"]).timestamp())
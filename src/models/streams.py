@@ -0,0 +1,151 @@
+import json
+import os
+import shutil
+import numpy as np
+from typing import Any, Dict, Iterator, List, Optional
+from config import STREAM_STORE_DIR
+
+# チャンネルごとの保存形式
+#   time    : 先頭からの差分（通常 1 秒）を uint16 で持ち、先頭値は meta に置く
+#             （時計の巻き戻りなどで負の差分があれば符号付きの int32 / int64 にする）
+#   latlng  : 1e-6 度単位の int32（Strava は小数6桁なので可逆。欠損は MISSING_LATLNG）
+#   心拍・ケイデンス : int16（欠損は -1）
+#   その他   : float32
+CHANNEL_DTYPES = {
+    "distance": np.float32,
+    "altitude": np.float32,
+    "velocity_smooth": np.float32,
+    "heartrate": np.int16,
+    "cadence": np.int16,
+    "latlng": np.int32,
+}
+LATLNG_SCALE = 1_000_000
+MISSING_INT = -1
+# 緯度経度の欠損（-1 は有効な座標なので、範囲外の int32 の最小値を使う）
+MISSING_LATLNG = np.iinfo(np.int32).min
+
+
+def stream_dir(activity_id: int, root: str = STREAM_STORE_DIR) -> str:
+    return os.path.join(root, str(activity_id))
+
+
+def has_streams(activity_id: int, root: str = STREAM_STORE_DIR) -> bool:
+    return os.path.exists(os.path.join(stream_dir(activity_id, root), "meta.json"))
+
+
+def stream_ids(root: str = STREAM_STORE_DIR) -> List[int]:
+    """ストリームを保存済みのアクティビティ id（ディレクトリ一覧だけで判定し、中身は開かない）"""
+    if not os.path.isdir(root):
+        return []
+    return [int(name) for name in os.listdir(root) if name.isdigit() and has_streams(int(name), root)]
+
+
+def _encode(channel: str, data: list) -> np.ndarray:
+    dtype = CHANNEL_DTYPES[channel]
+    if channel == "latlng":
+        # None の点・None/NaN を含む点は欠損にする
+        pairs = np.array([(None, None) if v is None else v for v in data], dtype=np.float64).reshape(-1, 2)
+        missing = ~np.isfinite(pairs).all(axis=1)
+        encoded = np.rint(np.where(missing[:, None], 0.0, pairs) * LATLNG_SCALE).astype(dtype)
+        encoded[missing] = MISSING_LATLNG
+        return encoded
+    if np.issubdtype(dtype, np.integer):
+        return np.array([MISSING_INT if v is None else v for v in data], dtype=dtype)
+    return np.array([np.nan if v is None else v for v in data], dtype=dtype)
+
+
+def _delta_dtype(deltas: np.ndarray) -> type:
+    """時刻の差分を可逆に持てる最小の整数型（負の差分があれば符号付き）"""
+    if deltas.size == 0:
+        return np.uint16
+    lo, hi = deltas.min(), deltas.max()
+    if lo >= 0:
+        return np.uint16 if hi <= np.iinfo(np.uint16).max else np.uint32
+    info = np.iinfo(np.int32)
+    return np.int32 if info.min <= lo and hi <= info.max else np.int64
+
+
+def write_streams(activity_id: int, streams: Dict[str, Any], root: str = STREAM_STORE_DIR) -> str:
+    """
+    API のストリーム（key_by_type=true の形）をチャンネルごとの .npy に保存する。
+    一時ディレクトリに書いてから置き換えるので、途中で落ちても壊れたものは残らない。
+    """
+    time_data = np.asarray(streams["time"]["data"], dtype=np.int64)
+    deltas = np.diff(time_data, prepend=time_data[:1])
+    delta_dtype = _delta_dtype(deltas)
+    meta = {
+        "activity_id": int(activity_id),
+        "samples": int(time_data.size),
+        "t0": int(time_data[0]) if time_data.size else 0,
+        "channels": {"time": np.dtype(delta_dtype).name},
+    }
+
+    path = stream_dir(activity_id, root)
+    tmp_path = path + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, "time.npy"), deltas.astype(delta_dtype))
+    for channel in CHANNEL_DTYPES:
+        if channel in streams:
+            np.save(os.path.join(tmp_path, f"{channel}.npy"), _encode(channel, streams[channel]["data"]))
+            meta["channels"][channel] = np.dtype(CHANNEL_DTYPES[channel]).name
+    with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+class ActivityStreams:
+    """
+    1アクティビティ分のストリーム。各チャンネルはメモリマップした配列で、
+    slice() は時刻で切った範囲をコピーなしのビューで返す。
+    経過時間（time）だけは差分から一度だけ復元して持つ。
+    """
+
+    def __init__(self, activity_id: int, root: str = STREAM_STORE_DIR):
+        self.path = stream_dir(activity_id, root)
+        with open(os.path.join(self.path, "meta.json"), "r") as f:
+            self.meta = json.load(f)
+        self._channels: Dict[str, np.ndarray] = {}
+        deltas = self.channel("time")
+        acc = np.int64 if deltas.dtype == np.int64 else np.int32
+        self.time = self.meta["t0"] + np.cumsum(deltas, dtype=acc) if deltas.size else np.zeros(0, acc)
+
+    @property
+    def channels(self) -> Iterator[str]:
+        return iter(self.meta["channels"])
+
+    def __len__(self) -> int:
+        return self.meta["samples"]
+
+    def channel(self, name: str) -> np.ndarray:
+        """チャンネルの配列（読み取り専用のメモリマップ）"""
+        if name not in self._channels:
+            self._channels[name] = np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+        return self._channels[name]
+
+    def index_range(self, start: float, end: float) -> slice:
+        """start <= time < end に対応する添字の範囲"""
+        lo = int(np.searchsorted(self.time, start, side="left"))
+        hi = int(np.searchsorted(self.time, end, side="left"))
+        return slice(lo, hi)
+
+    def slice(self, start: float, end: float) -> Dict[str, np.ndarray]:
+        """時刻範囲 [start, end) の各チャンネル（time は復元済みの経過秒）"""
+        idx = self.index_range(start, end)
+        out = {"time": self.time[idx]}
+        for name in self.channels:
+            if name != "time":
+                out[name] = self.channel(name)[idx]
+        return out
+
+    def latlng_degrees(self, idx: Optional[slice] = None) -> np.ndarray:
+        """latlng を度に戻す（この変換だけはコピーになる。欠損は NaN）"""
+        data = self.channel("latlng")
+        data = data if idx is None else data[idx]
+        return np.where(data == MISSING_LATLNG, np.nan, data / LATLNG_SCALE)
+
+
+def open_streams(activity_id: int, root: str = STREAM_STORE_DIR) -> ActivityStreams:
+    return ActivityStreams(activity_id, root)
@@ -0,0 +1,174 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional
+from config import DATA_STORE_URI, HR_MAX, HR_REST
+from models.aggregate import local_days, today_number
+from models.store import read_store, sidecar_path
+
+# 疲労 (ATL) と体力 (CTL) の時定数（日）
+ATL_DAYS = 7
+CTL_DAYS = 42
+
+
+def _alpha(tau: int) -> float:
+    # 1日あたりの EWMA の重み
+    return 1.0 - np.exp(-1.0 / tau)
+
+
+def trimp(df: pd.DataFrame, hr_rest: float = HR_REST, hr_max: float = HR_MAX) -> np.ndarray:
+    """
+    Banister の TRIMP（分 × 心拍予備率 × 0.64·e^(1.92·心拍予備率)）。
+    時間は moving_time（無ければ elapsed_time）、最大心拍は hr_max と各アクティビティの max_heartrate の大きい方。
+    平均心拍の無いアクティビティは 0。
+    """
+    minutes = df["moving_time"].fillna(df["elapsed_time"]).to_numpy(dtype="float64", na_value=0.0) / 60.0
+    avg = df["average_heartrate"].to_numpy(dtype="float64", na_value=np.nan)
+    peak = np.fmax(df["max_heartrate"].to_numpy(dtype="float64", na_value=np.nan), hr_max)
+    ratio = np.clip((avg - hr_rest) / (peak - hr_rest), 0.0, 1.0)
+    return np.nan_to_num(minutes * ratio * 0.64 * np.exp(1.92 * ratio))
+
+
+def daily_trimp(df: pd.DataFrame, date_col: str = "start_date_local") -> pd.Series:
+    """日ごとの TRIMP 合計（index は 1970-01-01 からの日数、活動の無い日も 0 で埋める）"""
+    if df.empty:
+        return pd.Series(dtype="float64")
+    days = local_days(df, date_col)
+    first = days.min()
+    totals = np.bincount(days - first, weights=trimp(df))
+    return pd.Series(totals, index=np.arange(first, first + len(totals)))
+
+
+def training_load(df: pd.DataFrame, until: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """
+    履歴全体から日ごとの TRIMP / ATL / CTL / TSB (= CTL - ATL) を計算する。
+    until を渡すとその日まで（活動の無い日は減衰だけ）延ばす。
+    """
+    daily = daily_trimp(df)
+    if until is not None and not daily.empty:
+        daily = daily.reindex(np.arange(daily.index[0], today_number(until)[0] + 1), fill_value=0.0)
+    out = pd.DataFrame({"trimp": daily})
+    # 初日の前日を 0 として x_t = x_{t-1} + α (trimp_t - x_{t-1})
+    for col, tau in (("atl", ATL_DAYS), ("ctl", CTL_DAYS)):
+        padded = pd.concat([pd.Series([0.0]), daily], ignore_index=True)
+        out[col] = padded.ewm(alpha=_alpha(tau), adjust=False).mean().to_numpy()[1:]
+    out["tsb"] = out["ctl"] - out["atl"]
+    out.index = pd.to_datetime(out.index.to_numpy().astype("datetime64[D]"))
+    return out
+
+
+def empty_state() -> Dict[str, Any]:
+    return {"day": None, "atl": 0.0, "ctl": 0.0}
+
+
+def advance(state: Dict[str, Any], day: int) -> Dict[str, Any]:
+    """活動の無い日を day まで進める（減衰を (1-α)^日数 で一度にかける）"""
+    if state["day"] is None:
+        return dict(state, day=day)
+    if day <= state["day"]:
+        return state
+    gap = day - state["day"]
+    return {
+        "day": day,
+        "atl": float(state["atl"] * (1.0 - _alpha(ATL_DAYS)) ** gap),
+        "ctl": float(state["ctl"] * (1.0 - _alpha(CTL_DAYS)) ** gap),
+    }
+
+
+def apply_trimp(state: Dict[str, Any], day: int, load: float) -> Dict[str, Any]:
+    """
+    day の TRIMP を load だけ足した状態を O(1) で返す。
+    EWMA は入力について線形なので、state より前の日付の追加でも
+    α·load·(1-α)^(経過日数) を足すだけで全履歴の再計算と同じ値になる。
+    """
+    state = advance(state, day)
+    gap = state["day"] - day
+    return {
+        "day": state["day"],
+        "atl": float(state["atl"] + _alpha(ATL_DAYS) * load * (1.0 - _alpha(ATL_DAYS)) ** gap),
+        "ctl": float(state["ctl"] + _alpha(CTL_DAYS) * load * (1.0 - _alpha(CTL_DAYS)) ** gap),
+    }
+
+
+def apply_activities(state: Dict[str, Any], df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    追加されたアクティビティをまとめて状態に反映する。
+    最新の日まで進めてから各 TRIMP の寄与を足し合わせるだけなので、履歴の長さには依らない。
+    """
+    if df.empty:
+        return state
+    days = local_days(df)
+    loads = trimp(df)
+    state = advance(state, int(days.max()))
+    gaps = state["day"] - days
+    return {
+        "day": state["day"],
+        "atl": state["atl"] + float(np.sum(_alpha(ATL_DAYS) * loads * (1.0 - _alpha(ATL_DAYS)) ** gaps)),
+        "ctl": state["ctl"] + float(np.sum(_alpha(CTL_DAYS) * loads * (1.0 - _alpha(CTL_DAYS)) ** gaps)),
+    }
+
+
+def current_load(state: Dict[str, Any], now: Optional[pd.Timestamp] = None) -> Dict[str, float]:
+    """今日時点の ATL / CTL / TSB"""
+    if state["day"] is None:
+        return {"atl": 0.0, "ctl": 0.0, "tsb": 0.0}
+    state = advance(state, int(today_number(now)[0]))
+    return {"atl": state["atl"], "ctl": state["ctl"], "tsb": state["ctl"] - state["atl"]}
+
+
+def training_summary(state: Dict[str, Any], now: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """ダッシュボード用の1行の表（疲労・体力・コンディション）"""
+    load = current_load(state, now)
+    return pd.DataFrame({
+        "疲労 (ATL)": [round(load["atl"], 1)],
+        "体力 (CTL)": [round(load["ctl"], 1)],
+        "コンディション (TSB)": [round(load["tsb"], 1)],
+    })
+
+
+def training_state_path(uri: str = DATA_STORE_URI) -> str:
+    """ストアごとの状態ファイル（例: tmp_csv/activities.csv.training.json）"""
+    return sidecar_path(uri, ".training.json")
+
+
+def read_training_state(uri: str = DATA_STORE_URI) -> Optional[Dict[str, Any]]:
+    path = training_state_path(uri)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_training_state(state: Dict[str, Any], uri: str = DATA_STORE_URI) -> None:
+    path = training_state_path(uri)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, path)
+
+
+def update_training_state(
+    added: pd.DataFrame, uri: str = DATA_STORE_URI, history: Optional[pd.DataFrame] = None
+) -> Dict[str, Any]:
+    """
+    新しく追加されたアクティビティの分だけ状態を進めて保存する。
+    状態ファイルがまだ無ければ history（追加分を含む全履歴）から一度だけ作る。
+    """
+    state = read_training_state(uri)
+    if state is None:
+        state = apply_activities(empty_state(), history if history is not None else added)
+    else:
+        state = apply_activities(state, added)
+    write_training_state(state, uri)
+    return state
+
+
+def training_summary_from_store(uri: str = DATA_STORE_URI, now: Optional[pd.Timestamp] = None) -> pd.DataFrame:
+    """保存した状態を今日まで減衰させた表（状態ファイルが無ければ全履歴から作る）"""
+    state = read_training_state(uri)
+    if state is None:
+        columns = ["start_date_local", "moving_time", "elapsed_time", "average_heartrate", "max_heartrate"]
+        state = apply_activities(empty_state(), read_store(uri, columns))
+    return training_summary(state, now)
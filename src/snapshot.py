@@ -0,0 +1,133 @@
+"""
+ダッシュボードの静的スナップショットを作る。
+
+app.py の main と同じモデルの処理を1回だけ実行し、HTML（plotly.js を埋め込んだ単体ファイル）と
+JSON を書き出す。同期のあとに実行すれば、表示用の画面はファイルを配信するだけで済む。
+
+    $ python3 src/snapshot.py -o tmp_snapshot
+"""
+import argparse
+import html
+import json
+import os
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from config import DATA_STORE_URI, LATEST_N, SNAPSHOT_DIR
+from models.activities import chart_source_from_store, load_latest_n, prepare_chart_source, summary_from_store, top_k_from_store
+from models.best_efforts import best_effort_leaders_from_store, stream_store_version
+from models.store import store_version
+from models.training_load import training_summary_from_store
+from views.chart import distance_bar_figure
+
+# 上位3件の表（列名: 見出し。app.py と同じ）
+TOP_COLUMNS = {"distance": "distance", "total_elevation_gain": "total_elevation_gain", "max_heartrate": "max heartrate"}
+
+
+def build_snapshot(uri: str = DATA_STORE_URI, now: Optional[pd.Timestamp] = None) -> Dict[str, Any]:
+    """ダッシュボードと同じ表・グラフのデータを作る"""
+    latest = load_latest_n(LATEST_N, uri)
+    top3 = top_k_from_store(list(TOP_COLUMNS), 3, LATEST_N, uri)
+    tables: List[Tuple[str, pd.DataFrame]] = [
+        (f"Top 3 {label} activities (Latest {LATEST_N} activities)", top3[col]) for col, label in TOP_COLUMNS.items()
+    ]
+    tables += [(f"Best {col} efforts (All activities)", df) for col, df in best_effort_leaders_from_store(3, uri).items()]
+    tables += [
+        ("Summary(Total Distance and Elevation)", summary_from_store(LATEST_N, uri, now)),
+        ("Training load (TRIMP based)", training_summary_from_store(uri, now)),
+        (f"Latest {LATEST_N} activities", latest),
+    ]
+    charts = [
+        ("Each Activity Distance", prepare_chart_source(latest)),
+        ("Distance (All time)", chart_source_from_store(uri=uri)),
+    ]
+    return {"tables": tables, "charts": charts}
+
+
+def _records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    # 日時は ISO 8601、所要時間は秒に直して JSON にする
+    out = df.copy()
+    for col in out.columns:
+        if pd.api.types.is_timedelta64_dtype(out[col]):
+            out[col] = out[col].dt.total_seconds()
+    return json.loads(out.to_json(orient="records", date_format="iso", force_ascii=False))
+
+
+def render_json(snapshot: Dict[str, Any], version: str, generated_at: pd.Timestamp) -> str:
+    return json.dumps({
+        "generated_at": generated_at.isoformat(),
+        "store_version": version,
+        "tables": {title: _records(df) for title, df in snapshot["tables"]},
+        "charts": {title: _records(df) for title, df in snapshot["charts"]},
+    }, ensure_ascii=False)
+
+
+def render_html(snapshot: Dict[str, Any], generated_at: pd.Timestamp) -> str:
+    """外部のファイルやサーバに依存しない1枚の HTML（plotly.js は最初のグラフにだけ埋め込む）"""
+    body = [f"<h1>Strava activities</h1><p>Generated at {html.escape(generated_at.isoformat())}</p>"]
+    for i, (title, df) in enumerate(snapshot["charts"]):
+        fig = distance_bar_figure(df, title)
+        body.append(f"<h2>{html.escape(title)}</h2>")
+        body.append(fig.to_html(full_html=False, include_plotlyjs=(i == 0)))
+    for title, df in snapshot["tables"]:
+        body.append(f"<h2>{html.escape(title)}</h2>")
+        body.append(df.to_html(index=False, na_rep="", border=0))
+    return (
+        "<!DOCTYPE html><html lang=\"ja\"><head><meta charset=\"utf-8\"><title>Strava activities</title>"
+        "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse}"
+        "td,th{padding:2px 8px;border-bottom:1px solid #ddd;text-align:right}</style></head><body>"
+        + "\n".join(body)
+        + "</body></html>"
+    )
+
+
+def _write_text(path: str, text: str) -> None:
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def write_snapshot(out_dir: str = SNAPSHOT_DIR, uri: str = DATA_STORE_URI, force: bool = False) -> bool:
+    """
+    index.html と snapshot.json を書き出す。ストア（とストリーム）が前回から変わっていなければ何もしない
+    （今週・今月の集計は日付でも変わるので、日付が変わった場合も作り直す）。
+    """
+    version = f"{store_version(uri)}|{stream_store_version()}"
+    now = pd.Timestamp.now(tz="Asia/Tokyo")
+    json_path = os.path.join(out_dir, "snapshot.json")
+    if not force and os.path.exists(json_path):
+        with open(json_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        if previous.get("store_version") == version and previous.get("generated_at", "")[:10] == now.date().isoformat():
+            return False
+
+    snapshot = build_snapshot(uri, now)
+    os.makedirs(out_dir, exist_ok=True)
+    # HTML を先に置き換え、JSON（バージョンの記録）は最後に書く
+    _write_text(os.path.join(out_dir, "index.html"), render_html(snapshot, now))
+    _write_text(json_path, render_json(snapshot, version, now))
+    return True
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="ダッシュボードの静的スナップショットを作る")
+    parser.add_argument("-o", "--output", default=SNAPSHOT_DIR, help="出力先ディレクトリ")
+    parser.add_argument("--store", default=DATA_STORE_URI, help="読み込むストアの URI")
+    parser.add_argument("--force", action="store_true", help="ストアが変わっていなくても作り直す")
+    return parser.parse_args()
+
+
+def main() -> None:
+    """エントリーポイント"""
+    args = parse_args()
+    if write_snapshot(args.output, args.store, args.force):
+        print(f"スナップショットを '{args.output}' に書き出しました。", file=sys.stderr)
+    else:
+        print("ストアに変更が無いのでスキップしました。", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,43 @@
 import streamlit as st
 import plotly.express as px
+import plotly.graph_objects as go
 import pandas as pd
+from instrument import span
+
+def distance_bar_figure(df: pd.DataFrame, title: str = "Each Activity Distance") -> go.Figure:
+    # 色は種別ごと（トレース数は種別の数で頭打ち）。名前はホバーに出す
+    if "name" in df.columns:
+        # アクティビティごとの棒（件数が少ないとき）
+        fig = px.bar(
+            df,
+            x="start_date_local",
+            y="distance",
+            color="type",
+            hover_name="name",
+            title=title,
+            barmode="group"
+        )
+        # 太さ（幅）の調整：カテゴリ/密度により見え方が変わる点に注意
+        fig.update_traces(width=0.8)
+    else:
+        # 期間×種別に集計済み（prepare_chart_source / chart_source_from_store）
+        fig = px.bar(
+            df,
+            x="start_date_local",
+            y="distance",
+            color="type",
+            hover_data=["count"],
+            title=title,
+            barmode="stack"
+        )
+    return fig
 
 def activity_distance_bar(df: pd.DataFrame, title: str = "Each Activity Distance"):
-    fig = px.bar(
-        df,
-        x="start_date_local",
-        y="distance",
-        color="name",
-        title=title,
-        barmode="group"
-    )
-    # 太さ（幅）の調整：カテゴリ/密度により見え方が変わる点に注意
-    fig.update_traces(width=0.8)
+    # 図の組み立ては distance_bar_figure に分けてあり、静的スナップショットでも同じ図を使う
     st.subheader(title)
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    with span("render.chart", len(df)) as s:
+        fig = distance_bar_figure(df, title)
+        st.plotly_chart(fig, use_container_width=True)
+        if s is not None:
+            # plotly_chart はフィギュアの JSON をそのまま送る
+            s.rows_out, s.bytes_out = len(df), len(fig.to_json())
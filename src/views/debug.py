@@ -0,0 +1,13 @@
+import streamlit as st
+import pandas as pd
+from instrument import openmetrics
+
+def show_debug_panel(spans: pd.DataFrame):
+    # 計測を有効にしたときだけ出す。この実行の区間（入れ子は字下げ）と累計の OpenMetrics
+    with st.sidebar.expander("Debug: timings", expanded=False):
+        view = spans.assign(span=["  " * d + name for name, d in zip(spans["span"], spans["depth"])])
+        st.dataframe(view.drop(columns="depth").round({"ms": 2}), hide_index=True)
+        st.caption(f"total {spans.loc[spans['depth'] == 0, 'ms'].sum():.1f} ms")
+        text = openmetrics()
+        st.download_button("Download metrics (OpenMetrics)", text, file_name="dashboard.prom", mime="text/plain")
+        st.code(text, language="text")
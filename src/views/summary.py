@@ -1,6 +1,10 @@
 import streamlit as st
 import pandas as pd
+from instrument import dataframe_bytes, span
 
 def show_summary(title: str, df: pd.DataFrame):
     st.subheader(title)
-    st.dataframe(df)
\ No newline at end of file
+    with span(f"render.summary:{title}", len(df)) as s:
+        st.dataframe(df)
+        if s is not None:
+            s.rows_out, s.bytes_out = len(df), dataframe_bytes(df)
@@ -1,9 +1,36 @@
 import streamlit as st
 import pandas as pd
+from typing import Callable, Sequence, Tuple
+from instrument import dataframe_bytes, span
 
 def show_table(title: str, df: pd.DataFrame):
     st.subheader(title)
-    st.dataframe(df)
+    _send_dataframe(f"render.table:{title}", df)
+
+def _send_dataframe(name: str, df: pd.DataFrame):
+    # 計測時は送ったデータ量（Arrow IPC 換算）も記録する
+    with span(name, len(df)) as s:
+        st.dataframe(df)
+        if s is not None:
+            s.rows_out, s.bytes_out = len(df), dataframe_bytes(df)
 
 def show_title(main_title: str):
-    st.title(main_title)
\ No newline at end of file
+    st.title(main_title)
+
+def show_paged_table(
+    title: str,
+    fetch_page: Callable[[int, int, Tuple[str, ...]], pd.DataFrame],
+    total: int,
+    columns: Sequence[str],
+    default_columns: Sequence[str],
+    page_size: int = 30,
+    key: str = "paged_table",
+):
+    # 表示中のページ・選んだ列だけを fetch_page で取り出して送る（全件はシリアライズしない）
+    st.subheader(title)
+    selected = st.multiselect("Columns", list(columns), default=list(default_columns), key=f"{key}_columns")
+    pages = max((total + page_size - 1) // page_size, 1)
+    page = st.number_input(f"Page (1-{pages})", min_value=1, max_value=pages, value=1, key=f"{key}_page")
+    offset = (int(page) - 1) * page_size
+    _send_dataframe(f"render.table:{title}", fetch_page(offset, page_size, tuple(selected or default_columns)))
+    st.caption(f"{offset + 1 if total else 0}-{min(offset + page_size, total)} of {total}")